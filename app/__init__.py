@@ -3,12 +3,20 @@ from flask_restful import Api
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from .config import Config
+from .utils.db import release_request_connection
+from .utils.metrics import start_request_timer, add_request_timing
+from .utils.serialization import FastJSONProvider, output_json
+from .utils.compression import compress_response
 from .resources.user import (ProfessionalRegistration, ProfessionalLogin,
                              PatientLogin, PatientRegistration,
-                             PatientList, PatientDetails,
+                             PatientList, PatientSearch, PatientDetails,
+                             PatientImport, PatientExport,
                              DeletePatient, UpdatePatient,
-                             CreateMealPlan, GetMealPlan,
-                             UpdateMealPlan, DeleteMealPlan, FoodList,
+                             CreateMealPlan, GetMealPlan, MealPlanSummary,
+                             ProfessionalDashboard,
+                             UpdateMealPlan, DeleteMealPlan,
+                             MealPlanEntries, MealPlanEntryResource,
+                             MealPlanEntryFoods, MealPlanFoodResource, FoodList,
                              ProfessionalDetails)
 
 from .resources.protected import ProtectedResource
@@ -17,9 +25,21 @@ from .resources.test_connection import TestConnection
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    # Decimal, datas e horários do banco são serializados direto, sem cópia da resposta
+    app.json = FastJSONProvider(app)
     CORS(app)
     jwt = JWTManager(app)
     api = Api(app)
+    api.representation('application/json')(output_json)
+
+    # Devolve ao pool a conexão usada pela requisição
+    app.teardown_appcontext(release_request_connection)
+
+    # Tempo total, queries, tempo de banco e de espera pelo pool (header Server-Timing e log app.requests)
+    app.before_request(start_request_timer)
+    app.after_request(add_request_timing)
+    # gzip/brotli conforme Accept-Encoding; registrado depois, roda antes da medição acima
+    app.after_request(compress_response)
 
     # Adicionando recursos à API
     api.add_resource(ProfessionalRegistration, '/register')
@@ -30,14 +50,23 @@ def create_app():
     api.add_resource(PublicResource, '/public')
     api.add_resource(TestConnection, '/test-connection')
     api.add_resource(PatientList, '/patients/<int:professional_id>')
+    api.add_resource(PatientSearch, '/patients/<int:professional_id>/search')
+    api.add_resource(ProfessionalDashboard, '/patients/<int:professional_id>/dashboard')
+    api.add_resource(PatientImport, '/patients/<int:professional_id>/import')
+    api.add_resource(PatientExport, '/patients/<int:professional_id>/export')
     api.add_resource(PatientDetails, '/patient/<int:id>')
     api.add_resource(DeletePatient, '/deletePatient/<int:id>')
     # api.add_resource(UpdatePatient, '/patient/<int:id>/update')
     api.add_resource(UpdatePatient, '/register/patient/<int:id>')
     api.add_resource(CreateMealPlan, '/api/meal-plans')
     api.add_resource(GetMealPlan, '/api/meal-plans/<int:patient_id>')
+    api.add_resource(MealPlanSummary, '/api/meal-plans/<int:patient_id>/summary')
     api.add_resource(UpdateMealPlan, '/api/meal-plans/<int:patient_id>')
     api.add_resource(DeleteMealPlan, '/api/meal-plans/<int:patient_id>')
+    api.add_resource(MealPlanEntries, '/api/meal-plans/<int:patient_id>/entries')
+    api.add_resource(MealPlanEntryResource, '/api/meal-plans/<int:patient_id>/entries/<int:entry_id>')
+    api.add_resource(MealPlanEntryFoods, '/api/meal-plans/<int:patient_id>/entries/<int:entry_id>/foods')
+    api.add_resource(MealPlanFoodResource, '/api/meal-plans/<int:patient_id>/entries/<int:entry_id>/foods/<int:food_id>')
     # api.add_resource(ListPatientMealPlans, '/api/patients/<int:patient_id>/meal-plans')
     api.add_resource(FoodList, '/api/foods')
     api.add_resource(ProfessionalDetails, '/api/professional/details')
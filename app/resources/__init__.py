@@ -1,4 +1,4 @@
-from .user import ProfessionalRegistration, ProfessionalLogin, PatientLogin, PatientRegistration, DeletePatient, UpdatePatient, CreateMealPlan, GetMealPlan,UpdateMealPlan, DeleteMealPlan, FoodList, ProfessionalDetails
+from .user import ProfessionalRegistration, ProfessionalLogin, PatientLogin, PatientRegistration, DeletePatient, UpdatePatient, PatientSearch, PatientImport, PatientExport, CreateMealPlan, GetMealPlan, MealPlanSummary, ProfessionalDashboard, UpdateMealPlan, DeleteMealPlan, MealPlanEntries, MealPlanEntryResource, MealPlanEntryFoods, MealPlanFoodResource, FoodList, ProfessionalDetails
 from .protected import ProtectedResource
 from .public import PublicResource
 from .test_connection import TestConnection
\ No newline at end of file
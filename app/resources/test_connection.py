@@ -1,12 +1,13 @@
 from flask_restful import Resource
 from flask import jsonify
-from app.utils.db import connect_database
+import pymysql
+from app.utils.db import get_db_connection, PoolExhaustedError
 
 class TestConnection(Resource):
     def get(self):
-        connection = connect_database()
-        if connection:
-            connection.close()
+        try:
+            with get_db_connection() as connection:
+                connection.ping(reconnect=False)
             return jsonify({"message": "Conexão bem-sucedida com o banco de dados"})
-        else:
+        except (pymysql.MySQLError, PoolExhaustedError):
             return jsonify({"message": "Falha na conexão com o banco de dados"}), 500
\ No newline at end of file
@@ -1,74 +1,85 @@
 from flask_restful import Resource
-from flask import request, jsonify
+from flask import request, jsonify, Response
 import re
+import os
+import io
+import csv
 import json
-from werkzeug.security import generate_password_hash, check_password_hash
+import base64
+import binascii
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
-from app.utils.db import execute_query
+from app.utils.db import (execute_query, execute_many_concurrently, transaction, stream_query,
+                          release_request_connection)
 from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
 import logging
-from pydantic import BaseModel, Field, model_validator, ValidationError
-from typing import List, Optional
-from app.utils.db import convert_decimal
-
-def validate_password(password):
-    criteria = {
-        'length': {'regex': r'.{8,}', 'message': 'A senha deve ter pelo menos 8 caracteres'},
-        'uppercase': {'regex': r'[A-Z]', 'message': 'A senha deve conter pelo menos uma letra maiúscula'},
-        'lowercase': {'regex': r'[a-z]', 'message': 'A senha deve conter pelo menos uma letra minúscula'},
-        'number': {'regex': r'[0-9]', 'message': 'A senha deve conter pelo menos um número'},
-        'special': {'regex': r'[!@#$%^&*(),.?":{}|<>]', 'message': 'A senha deve conter pelo menos um caractere especial'}
-    }
-
-    for key, value in criteria.items():
-        if not re.search(value['regex'], password):
-            return False, value['message']
-
-    return True, 'Senha válida'
+import pymysql
+from app.utils.food_catalog import food_catalog, normalize_food_name
+from app.utils.passwords import submit_password_hash, hash_passwords, verify_and_update
+from app.utils.identity_cache import token_claims, get_identity, invalidate_identity
+from app.utils.nutrition import get_meal_plan_totals
+from app.utils.response_cache import meal_plan_cache
+from app.utils.streaming import stream_json_array, stream_ndjson, stream_csv
+from app.utils.compression import negotiate_encoding
+from app.utils.validation import (ELEVEN_DIGITS_RE, validate_payload, ProfessionalRegistrationData,
+                                  PatientRegistrationData, PatientUpdateData, MealPlanCreateData,
+                                  MealPlanUpdateData, MealPlanEntryData, MealPlanEntryPatchData,
+                                  MealPlanFoodData, MealPlanFoodPatchData)
+
+def login_lookup_condition(login):
+    """
+    Escolhe a coluna indexada usada para localizar o usuário no login
+
+    Returns:
+        tuple: (condição SQL, parâmetros)
+    """
+    # CPF e celular podem chegar como número no JSON
+    login = str(login)
+    if '@' in login:
+        return 'email = %s', (login,)
+    if ELEVEN_DIGITS_RE.match(login):
+        # CPF e celular têm 11 dígitos; os dois índices são combinados (index merge)
+        return '(cpf = %s OR phone = %s)', (login, login)
+    return 'phone = %s', (login,)
 
 class ProfessionalRegistration(Resource):
     def post(self):
         data = request.get_json()
 
-        required_fields = ['full_name', 'email', 'password', 'cpf', 'phone', 'regional_council_type', 'regional_council']
-        for field in required_fields:
-            if not data.get(field):
-                return {'message': f'O campo {field} é obrigatório'}, 400
+        professional, error = validate_payload(ProfessionalRegistrationData, data)
+        if error:
+            return error, 400
 
-        full_name = data['full_name']
-        email = data['email']
-        password = data['password']
-        cpf = data['cpf']
-        phone = data['phone']
-        regional_council_type = data['regional_council_type']
-        regional_council = data['regional_council']
+        full_name = professional.full_name
+        email = professional.email
+        password = professional.password
+        cpf = professional.cpf
+        phone = professional.phone
+        regional_council_type = professional.regional_council_type
+        regional_council = professional.regional_council
 
-        if not re.match(r'^[0-9]{11}$', cpf):
-            return {'message': 'Formato de CPF inválido'}, 400
-        if not re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', email):
-            return {'message': 'Formato de e-mail inválido'}, 400
-        if len(phone) != 11:
-            return {'message': 'O número de telefone deve ter 11 caracteres'}, 400
-
-        password_valid, password_message = validate_password(password)
-        if not password_valid:
-            return {'message': password_message}, 400
-
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256:100000', salt_length=8)
+        # O hash é calculado em outro processo enquanto a verificação de duplicidade roda no banco
+        hashed_password_future = submit_password_hash(password)
 
         try:
             check_query = "SELECT * FROM tb_professionals WHERE email = %s OR cpf = %s OR phone = %s"
             result = execute_query(check_query, (email, cpf, phone))
             if result:
+                hashed_password_future.cancel()
                 return {'message': 'Email, CPF ou número de telefone já registrado'}, 409
+            hashed_password = hashed_password_future.result()
 
             insert_query = """
                 INSERT INTO tb_professionals (full_name, email, password, cpf, phone, regional_council_type, regional_council, created_at, updated_at) 
                 VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
             """
-            execute_query(insert_query, (full_name, email, hashed_password, cpf, phone, regional_council_type, regional_council))
+            professional_id = execute_query(
+                insert_query,
+                (full_name, email, hashed_password, cpf, phone, regional_council_type, regional_council),
+                return_id=True
+            )
 
-            access_token = create_access_token(identity=email, additional_claims={"role": "professional"})
+            access_token = create_access_token(identity=str(professional_id), additional_claims=token_claims('professional'))
             return {'message': 'Profissional registrado com sucesso', 'access_token': access_token}, 201
         except Exception as e:
             return {'message': str(e)}, 500
@@ -83,24 +94,20 @@ class ProfessionalLogin(Resource):
             return {'message': 'E-mail e senha são obrigatórios'}, 400
 
         try:
-            query = """
-                SELECT id, full_name, email, password, cpf, phone, regional_council_type, regional_council
+            condition, params = login_lookup_condition(login)
+            query = f"""
+                SELECT id, password
                 FROM tb_professionals
-                WHERE email = %s OR cpf = %s OR phone = %s
+                WHERE {condition}
             """
-            result = execute_query(query, (login, login, login))
-            if result and check_password_hash(result[0]['password'], password):
-                user_data = {
-                    'id': str(result[0]['id']),
-                    'full_name': result[0]['full_name'],
-                    'email': result[0]['email'],
-                    'cpf': result[0]['cpf'],
-                    'phone': result[0]['phone'],
-                    'regional_council_type': result[0]['regional_council_type'],
-                    'regional_council': result[0]['regional_council'],
-                    'role': 'professional'
-                }
-                access_token = create_access_token(identity=str(result[0]['id']), additional_claims=user_data)
+            result = execute_query(query, params)
+            password_valid, new_hash = verify_and_update(result[0]['password'], password) if result else (False, None)
+            if password_valid:
+                if new_hash:
+                    # Hash gerado com parâmetros antigos: regrava com o algoritmo/custo atuais
+                    rehash_query = "UPDATE tb_professionals SET password = %s, updated_at = updated_at WHERE id = %s"
+                    execute_query(rehash_query, (new_hash, result[0]['id']))
+                access_token = create_access_token(identity=str(result[0]['id']), additional_claims=token_claims('professional'))
                 return {'access_token': access_token}, 200
             else:
                 return {'message': 'Credenciais inválidas'}, 401
@@ -117,26 +124,20 @@ class PatientLogin(Resource):
             return {'message': 'Login e senha são obrigatórios'}, 400
 
         try:
-            query = """
-                SELECT id, full_name, birth_date, gender, email, password, phone, cpf, weight, height
+            condition, params = login_lookup_condition(login)
+            query = f"""
+                SELECT id, password
                 FROM tb_patients
-                WHERE email = %s OR cpf = %s OR phone = %s
+                WHERE {condition}
             """
-            result = execute_query(query, (login, login, login))
-            if result and check_password_hash(result[0]['password'], password):
-                user_data = {
-                    'id': str(result[0]['id']),
-                    'full_name': result[0]['full_name'],
-                    'birth_date': result[0]['birth_date'].isoformat() if result[0]['birth_date'] else None,
-                    'gender': result[0]['gender'],
-                    'email': result[0]['email'],
-                    'phone': result[0]['phone'],
-                    'cpf': result[0]['cpf'],
-                    'weight': float(result[0]['weight']) if result[0]['weight'] else None,
-                    'height': float(result[0]['height']) if result[0]['height'] else None,
-                    'role': 'patient'
-                }
-                access_token = create_access_token(identity=str(result[0]['id']), additional_claims=user_data)
+            result = execute_query(query, params)
+            password_valid, new_hash = verify_and_update(result[0]['password'], password) if result else (False, None)
+            if password_valid:
+                if new_hash:
+                    # Hash gerado com parâmetros antigos: regrava com o algoritmo/custo atuais
+                    rehash_query = "UPDATE tb_patients SET password = %s, updated_at = updated_at WHERE id = %s"
+                    execute_query(rehash_query, (new_hash, result[0]['id']))
+                access_token = create_access_token(identity=str(result[0]['id']), additional_claims=token_claims('patient'))
                 return {'access_token': access_token}, 200
             else:
                 return {'message': 'Credenciais inválidas'}, 401
@@ -153,62 +154,31 @@ class PatientRegistration(Resource):
 
         data = request.get_json()
 
-        full_name = data.get('full_name')
-        if not full_name or len(full_name.strip()) < 3:
-            return {'message': 'Nome completo deve ter pelo menos 3 caracteres'}, 400
-
-        birth_date = data.get('birth_date')
-        try:
-            birth_date = datetime.strptime(birth_date, '%Y-%m-%d').date()
-        except ValueError:
-            return {'message': 'Data de nascimento deve estar no formato YYYY-MM-DD'}, 400
-
-        gender = data.get('gender')
-        if gender not in ['M', 'F', 'O']:
-            return {'message': 'Gênero deve ser M, F ou O'}, 400
-
-        email = data.get('email')
-        if not re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', email):
-            return {'message': 'Formato de e-mail inválido'}, 400
-
-        password = data.get('password')
-        password_valid, password_message = validate_password(password)
-        if not password_valid:
-            return {'message': password_message}, 400
-
-        phone = data.get('phone')
-        if not re.match(r'^[0-9]{11}$', phone):
-            return {'message': 'O número de telefone deve ter 11 dígitos numéricos'}, 400
-
-        cpf = data.get('cpf')
-        if not re.match(r'^[0-9]{11}$', cpf):
-            return {'message': 'CPF deve ter 11 dígitos numéricos'}, 400
-
-        weight = data.get('weight')
-        try:
-            weight = float(weight)
-            if weight <= 0 or weight > 500:
-                return {'message': 'Peso deve ser um número positivo e menor que 500'}, 400
-        except (ValueError, TypeError):
-            return {'message': 'Peso deve ser um número válido'}, 400
-
-        height = data.get('height')
-        try:
-            height = float(height)
-            if height <= 0 or height > 3:
-                return {'message': 'Altura deve ser um número positivo entre 0 e 3'}, 400
-        except (ValueError, TypeError):
-            return {'message': 'Altura deve ser um número válido'}, 400
+        patient, error = validate_payload(PatientRegistrationData, data)
+        if error:
+            return error, 400
 
-        note = data.get('note')
+        full_name = patient.full_name
+        birth_date = patient.birth_date
+        gender = patient.gender
+        email = patient.email
+        password = patient.password
+        phone = patient.phone
+        cpf = patient.cpf
+        weight = patient.weight
+        height = patient.height
+        note = patient.note
 
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256:100000', salt_length=8)
+        # O hash é calculado em outro processo enquanto a verificação de duplicidade roda no banco
+        hashed_password_future = submit_password_hash(password)
 
         try:
             check_query = "SELECT * FROM tb_patients WHERE email = %s OR cpf = %s OR phone = %s"
             result = execute_query(check_query, (email, cpf, phone))
             if result:
+                hashed_password_future.cancel()
                 return {'message': 'Email, CPF ou número de telefone já registrado'}, 409
+            hashed_password = hashed_password_future.result()
 
             insert_query = """
                         INSERT INTO tb_patients (full_name, birth_date, gender, email, password, phone, 
@@ -236,35 +206,32 @@ class PatientRegistration(Resource):
             return {'message': f'Erro ao registrar paciente: {str(e)}'}, 500
 
 # Configuração do logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)
 
 class PatientDetails(Resource):
     def get(self, id):
-        logger.debug(f"Received request for patient ID: {id}")
         try:
             query = """
                 SELECT
                     id,
                     full_name,
-                    DATE_FORMAT(birth_date, '%%Y-%%m-%%d') AS birth_date,
+                    birth_date,
                     gender,
                     email,
                     phone,
                     cpf,
-                    CAST(weight AS CHAR) AS weight,
-                    CAST(height AS CHAR) AS height,
+                    weight,
+                    height,
                     note,
                     professional_id,
-                    DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS created_at,
-                    DATE_FORMAT(updated_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS updated_at
+                    created_at,
+                    updated_at
                 FROM tb_patients
                 WHERE id = %(id)s
             """
-            logger.debug(f"Executing query with patient id: {id}")
-            patientDetails = execute_query(query, {'id': id})
-            logger.debug(f"Query result: {patientDetails}")
-
+            # Perfil servido pelo cache de identidade; UpdatePatient/DeletePatient o invalidam
+            patientDetails = get_identity('patient', id, lambda: execute_query(query, {'id': id}) or None)
 
             if not patientDetails != None or not len(patientDetails) > 0:
                 return {'message': f'O paciente com id {id} não foi encontrado.'}, 404
@@ -275,40 +242,431 @@ class PatientDetails(Resource):
             logger.error(f"Error occurred: {str(e)}", exc_info=True)
             return {'message': f'Erro ao buscar paciente: {str(e)}'}, 500
 
+# Colunas que o parâmetro fields= pode pedir nas listagens de pacientes (PatientList, PatientSearch,
+# PatientExport), na ordem usada quando fields= não é enviado; só esses nomes entram no SELECT
+PATIENT_LIST_COLUMNS = (
+    'id', 'full_name', 'birth_date', 'gender', 'email', 'phone', 'cpf', 'weight', 'height', 'note',
+    'professional_id', 'created_at', 'updated_at'
+)
+PATIENT_LIST_DEFAULT_LIMIT = 50
+PATIENT_LIST_MAX_LIMIT = 200
+
+
+def parse_patient_fields(args):
+    """
+    Lê o parâmetro fields= (colunas separadas por vírgula) de uma listagem de pacientes
+
+    Returns:
+        tuple: (lista de campos, None) ou (None, mensagem de erro)
+    """
+    if not args.get('fields'):
+        return list(PATIENT_LIST_COLUMNS), None
+
+    fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+    invalid = [field for field in fields if field not in PATIENT_LIST_COLUMNS]
+    if invalid:
+        return None, f"Campos inválidos em fields: {', '.join(invalid)}"
+    # id é sempre retornado, pois é a chave do cursor
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields, None
+
+
+def parse_patient_list_args(args):
+    """
+    Lê limit, cursor, fields, include_total e stream da query string do PatientList
+
+    Returns:
+        tuple: (dict com os parâmetros, None) ou (None, mensagem de erro)
+    """
+    try:
+        limit = int(args.get('limit', PATIENT_LIST_DEFAULT_LIMIT))
+    except ValueError:
+        return None, 'limit deve ser um número inteiro'
+    if limit < 1 or limit > PATIENT_LIST_MAX_LIMIT:
+        return None, f'limit deve estar entre 1 e {PATIENT_LIST_MAX_LIMIT}'
+
+    cursor = args.get('cursor')
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            return None, 'cursor inválido'
+
+    fields, error = parse_patient_fields(args)
+    if error:
+        return None, error
+
+    include_total = args.get('include_total', '').lower() in ('1', 'true')
+    stream = args.get('stream', '').lower() in ('1', 'true')
+
+    return {'limit': limit, 'cursor': cursor, 'fields': fields, 'include_total': include_total, 'stream': stream}, None
+
+
 class PatientList(Resource):
     def get(self, professional_id):
-        logger.debug(f"Received request for professional_id: {professional_id}")
+        params, error = parse_patient_list_args(request.args)
+        if error:
+            return {'message': error}, 400
+
+        if params['stream']:
+            return self.stream(professional_id, params)
+
         try:
-            query = """
-                SELECT
-                    id,
-                    full_name,
-                    DATE_FORMAT(birth_date, '%%Y-%%m-%%d') AS birth_date,
-                    gender,
-                    email,
-                    phone,
-                    cpf,
-                    CAST(weight AS CHAR) AS weight,
-                    CAST(height AS CHAR) AS height,
-                    note,
-                    professional_id,
-                    DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS created_at,
-                    DATE_FORMAT(updated_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS updated_at
+            # Paginação por cursor (keyset) em id: cada página é uma leitura
+            # do índice de professional_id a partir do último id retornado
+            query = f"""
+                SELECT {', '.join(params['fields'])}
                 FROM tb_patients
                 WHERE professional_id = %(professional_id)s
+                {'AND id > %(cursor)s' if params['cursor'] is not None else ''}
+                ORDER BY id ASC
+                LIMIT %(limit)s
             """
-            logger.debug(f"Executing query with professional_id: {professional_id}")
-            patients = execute_query(query, {'professional_id': professional_id})
-            logger.debug(f"Query result: {patients}")
+            query_params = {
+                'professional_id': professional_id,
+                'cursor': params['cursor'],
+                # Uma linha a mais indica se existe próxima página
+                'limit': params['limit'] + 1
+            }
+            patients = execute_query(query, query_params)
 
-            if patients or patients.__sizeof__() > 0:
-                return {'patients': patients}, 200
-            else:
+            if not patients and params['cursor'] is None:
                 return {'message': 'Nenhum paciente encontrado para este profissional'}, 404
+
+            has_more = len(patients) > params['limit']
+            patients = patients[:params['limit']]
+            response = {
+                'patients': patients,
+                'next_cursor': patients[-1]['id'] if has_more else None
+            }
+
+            if params['include_total']:
+                count_query = "SELECT COUNT(*) AS total FROM tb_patients WHERE professional_id = %s"
+                response['total'] = execute_query(count_query, (professional_id,))[0]['total']
+
+            return response, 200
         except Exception as e:
             logger.error(f"Error occurred: {str(e)}", exc_info=True)
             return {'message': f'Erro ao buscar pacientes: {str(e)}'}, 500
 
+    def stream(self, professional_id, params):
+        """
+        Todos os pacientes (a partir de cursor, se informado) em uma única resposta
+
+        As linhas vêm de um cursor sem buffer e são serializadas conforme chegam,
+        então a memória é constante e o primeiro byte sai antes do fim da query.
+        """
+        try:
+            query = f"""
+                SELECT {', '.join(params['fields'])}
+                FROM tb_patients
+                WHERE professional_id = %(professional_id)s
+                {'AND id > %(cursor)s' if params['cursor'] is not None else ''}
+                ORDER BY id ASC
+            """
+            rows = stream_query(query, {'professional_id': professional_id, 'cursor': params['cursor']})
+            response = Response(stream_json_array(rows, key='patients'), mimetype='application/json')
+            # Libera a conexão mesmo que o corpo nunca seja lido (HEAD, cliente desconectado)
+            response.call_on_close(rows.close)
+            return response
+        except Exception as e:
+            logger.error(f"Error occurred: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao buscar pacientes: {str(e)}'}, 500
+
+# Pontuação ignorada em termos numéricos (CPF/telefone) e caracteres especiais do LIKE
+SEARCH_PUNCTUATION_RE = re.compile(r'[.\-\s()]')
+LIKE_SPECIAL_CHARS_RE = re.compile(r'([\\%_])')
+
+
+class PatientSearch(Resource):
+    @jwt_required()
+    def get(self, professional_id):
+        current_user = get_jwt_identity()
+        claims = get_jwt()
+        if claims.get('role') != 'professional' or int(current_user) != professional_id:
+            return {'message': 'Acesso não autorizado'}, 403
+
+        term = (request.args.get('q') or '').strip()
+        if not term:
+            return {'message': 'O parâmetro q é obrigatório'}, 400
+
+        try:
+            limit = int(request.args.get('limit', PATIENT_LIST_DEFAULT_LIMIT))
+        except ValueError:
+            return {'message': 'limit deve ser um número inteiro'}, 400
+        if limit < 1 or limit > PATIENT_LIST_MAX_LIMIT:
+            return {'message': f'limit deve estar entre 1 e {PATIENT_LIST_MAX_LIMIT}'}, 400
+
+        fields, error = parse_patient_fields(request.args)
+        if error:
+            return {'message': error}, 400
+        if 'full_name' not in fields:
+            fields.append('full_name')
+
+        cursor = None
+        if request.args.get('cursor'):
+            try:
+                cursor = json.loads(base64.urlsafe_b64decode(request.args['cursor'].encode()))
+                # O cursor é [full_name, id]; qualquer outro JSON válido também é rejeitado
+                if not isinstance(cursor, list) or len(cursor) != 2:
+                    raise ValueError('cursor inválido')
+                cursor_name, cursor_id = str(cursor[0]), int(cursor[1])
+            except (ValueError, TypeError, binascii.Error):
+                return {'message': 'cursor inválido'}, 400
+
+        # Cada tipo de termo é buscado apenas pela coluna indexada correspondente
+        digits = SEARCH_PUNCTUATION_RE.sub('', term)
+        if '@' in term:
+            condition = 'email = %(term)s'
+            term_param = term
+        elif digits.isdigit() and len(digits) == 11:
+            # CPF e celular têm 11 dígitos; os dois índices são usados (index merge)
+            condition = '(cpf = %(term)s OR phone = %(term)s)'
+            term_param = digits
+        elif digits.isdigit():
+            condition = 'phone LIKE %(term)s'
+            term_param = digits + '%'
+        else:
+            # Prefixo do nome: faixa no índice (professional_id, full_name)
+            condition = 'full_name LIKE %(term)s'
+            term_param = LIKE_SPECIAL_CHARS_RE.sub(r'\\\1', term) + '%'
+
+        try:
+            query = f"""
+                SELECT {', '.join(fields)}
+                FROM tb_patients
+                WHERE professional_id = %(professional_id)s
+                AND {condition}
+                {'AND (full_name > %(cursor_name)s OR (full_name = %(cursor_name)s AND id > %(cursor_id)s))' if cursor else ''}
+                ORDER BY full_name ASC, id ASC
+                LIMIT %(limit)s
+            """
+            patients = execute_query(query, {
+                'professional_id': professional_id,
+                'term': term_param,
+                'cursor_name': cursor_name if cursor else None,
+                'cursor_id': cursor_id if cursor else None,
+                'limit': limit + 1
+            })
+
+            has_more = len(patients) > limit
+            patients = patients[:limit]
+            next_cursor = None
+            if has_more:
+                last = patients[-1]
+                next_cursor = base64.urlsafe_b64encode(
+                    json.dumps([last['full_name'], last['id']]).encode()
+                ).decode()
+
+            return {'patients': patients, 'next_cursor': next_cursor}, 200
+        except Exception as e:
+            logger.error(f"Erro ao buscar pacientes: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao buscar pacientes: {str(e)}'}, 500
+
+
+# Cada senha custa dezenas de milissegundos de hashing: com os processos de PASSWORD_BULK_HASH_WORKERS,
+# o limite padrão mantém a importação bem abaixo do timeout do worker (GUNICORN_TIMEOUT)
+PATIENT_IMPORT_MAX_ROWS = int(os.getenv('PATIENT_IMPORT_MAX_ROWS', '500'))
+
+INSERT_PATIENT_QUERY = """
+    INSERT INTO tb_patients
+        (full_name, birth_date, gender, email, password, phone, cpf, weight, height, note, professional_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def patient_unique_key(field, value):
+    """
+    Chave de comparação de email/cpf/phone na importação
+
+    As colunas usam utf8mb4_unicode_ci, que ignora maiúsculas/minúsculas; cpf e
+    phone já são apenas dígitos.
+    """
+    return value.casefold() if field == 'email' else value
+
+
+def parse_patient_import(body, content_type):
+    """
+    Lê as linhas de uma importação de pacientes em CSV (com cabeçalho) ou NDJSON
+
+    Returns:
+        tuple: (lista de dicionários, None) ou (None, mensagem de erro)
+    """
+    if content_type in ('text/csv', 'application/csv'):
+        rows = []
+        for row in csv.DictReader(io.StringIO(body)):
+            # Colunas vazias do CSV equivalem a campos ausentes
+            rows.append({key: (value if value != '' else None) for key, value in row.items() if key})
+        return rows, None
+
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        rows = []
+        for line_number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                return None, f'Linha {line_number} não é um JSON válido'
+            if not isinstance(row, dict):
+                return None, f'Linha {line_number} deve ser um objeto JSON'
+            rows.append(row)
+        return rows, None
+
+    return None, 'Content-Type deve ser text/csv ou application/x-ndjson'
+
+
+class PatientImport(Resource):
+    """
+    Cadastro de vários pacientes de uma vez (CSV ou NDJSON)
+
+    Cada linha segue as regras do PatientRegistration; as linhas inválidas ou
+    duplicadas são relatadas e as demais são gravadas. O custo em queries é fixo:
+    uma verificação de duplicados para todas as linhas, um INSERT multi-linha e
+    uma leitura dos IDs gerados.
+    """
+
+    @jwt_required()
+    def post(self, professional_id):
+        current_user = get_jwt_identity()
+        claims = get_jwt()
+        if claims.get('role') != 'professional' or int(current_user) != professional_id:
+            return {'message': 'Acesso não autorizado'}, 403
+
+        rows, error = parse_patient_import(request.get_data(as_text=True), request.mimetype)
+        if error:
+            return {'message': error}, 400
+        if not rows:
+            return {'message': 'Nenhum paciente para importar'}, 400
+        if len(rows) > PATIENT_IMPORT_MAX_ROWS:
+            return {'message': f'A importação deve ter no máximo {PATIENT_IMPORT_MAX_ROWS} pacientes'}, 400
+
+        errors = []
+        valid = []
+        seen = {'email': set(), 'cpf': set(), 'phone': set()}
+        for index, row in enumerate(rows, start=1):
+            patient, error = validate_payload(PatientRegistrationData, row)
+            if error:
+                errors.append({'row': index, 'message': error['message']})
+                continue
+            patient = patient.model_dump()
+            # Duplicados dentro do próprio arquivo
+            if any(patient_unique_key(field, patient[field]) in seen[field] for field in seen):
+                errors.append({'row': index, 'message': 'Email, CPF ou número de telefone repetido na importação'})
+                continue
+            for field in seen:
+                seen[field].add(patient_unique_key(field, patient[field]))
+            valid.append((index, patient))
+
+        try:
+            # Duplicados já cadastrados, verificados para todas as linhas em uma única query
+            if valid:
+                check_query = """
+                    SELECT email, cpf, phone FROM tb_patients
+                    WHERE email IN %s OR cpf IN %s OR phone IN %s
+                """
+                existing = execute_query(check_query, tuple(
+                    [patient[field] for _, patient in valid] for field in ('email', 'cpf', 'phone')
+                ))
+                registered = {'email': set(), 'cpf': set(), 'phone': set()}
+                for row in existing:
+                    for field in registered:
+                        registered[field].add(patient_unique_key(field, row[field]))
+
+                remaining = []
+                for index, patient in valid:
+                    if any(patient_unique_key(field, patient[field]) in registered[field] for field in registered):
+                        errors.append({'row': index, 'message': 'Email, CPF ou número de telefone já registrado'})
+                    else:
+                        remaining.append((index, patient))
+                valid = remaining
+
+            imported = []
+            if valid:
+                # A conexão da requisição volta ao pool durante o hashing (segundos para
+                # lotes grandes); transaction() obtém outra para os INSERTs
+                release_request_connection()
+                hashed_passwords = hash_passwords(patient['password'] for _, patient in valid)
+
+                with transaction() as tx:
+                    tx.execute_many(INSERT_PATIENT_QUERY, [
+                        (
+                            patient['full_name'], patient['birth_date'], patient['gender'], patient['email'],
+                            hashed_password, patient['phone'], patient['cpf'], patient['weight'],
+                            patient['height'], patient['note'], professional_id
+                        )
+                        for (_, patient), hashed_password in zip(valid, hashed_passwords)
+                    ])
+                    # IDs de um INSERT multi-linha não são necessariamente sequenciais; busca pelo e-mail (único)
+                    ids_query = "SELECT id, email FROM tb_patients WHERE email IN %s"
+                    ids_by_email = {
+                        patient_unique_key('email', row['email']): row['id']
+                        for row in tx.execute(ids_query, ([patient['email'] for _, patient in valid],))
+                    }
+
+                imported = [
+                    {'row': index, 'patient_id': ids_by_email.get(patient_unique_key('email', patient['email']))}
+                    for index, patient in valid
+                ]
+
+            errors.sort(key=lambda error: error['row'])
+            response = {
+                'message': f'{len(imported)} de {len(rows)} pacientes importados',
+                'imported': imported,
+                'errors': errors
+            }
+            return response, 201 if imported else 400
+
+        except Exception as e:
+            if is_duplicate_entry_error(e):
+                return {'message': 'Email, CPF ou número de telefone já registrado', 'errors': errors}, 409
+            logger.error(f"Erro ao importar pacientes: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao importar pacientes: {str(e)}'}, 500
+
+
+class PatientExport(Resource):
+    """Exporta todos os pacientes do profissional em NDJSON (padrão) ou CSV, transmitidos conforme são lidos"""
+
+    @jwt_required()
+    def get(self, professional_id):
+        current_user = get_jwt_identity()
+        claims = get_jwt()
+        if claims.get('role') != 'professional' or int(current_user) != professional_id:
+            return {'message': 'Acesso não autorizado'}, 403
+
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in ('ndjson', 'csv'):
+            return {'message': 'format deve ser ndjson ou csv'}, 400
+
+        fields, error = parse_patient_fields(request.args)
+        if error:
+            return {'message': error}, 400
+
+        try:
+            query = f"""
+                SELECT {', '.join(fields)}
+                FROM tb_patients
+                WHERE professional_id = %s
+                ORDER BY id ASC
+            """
+            rows = stream_query(query, (professional_id,))
+
+            if export_format == 'csv':
+                body, mimetype = stream_csv(rows, fields), 'text/csv'
+            else:
+                body, mimetype = stream_ndjson(rows), 'application/x-ndjson'
+            response = Response(body, mimetype=mimetype)
+            # Libera a conexão mesmo que o corpo nunca seja lido (HEAD, cliente desconectado)
+            response.call_on_close(rows.close)
+            response.headers['Content-Disposition'] = f'attachment; filename=patients-{professional_id}.{export_format}'
+            return response
+
+        except Exception as e:
+            logger.error(f"Erro ao exportar pacientes: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao exportar pacientes: {str(e)}'}, 500
+
+
 class DeletePatient(Resource):
     @jwt_required()
     def delete(self, id):
@@ -323,6 +681,8 @@ class DeletePatient(Resource):
             # Deletar o paciente
             delete_query = "DELETE FROM tb_patients WHERE id = %s"
             execute_query(delete_query, (id,))
+            invalidate_identity('patient', id)
+            meal_plan_cache.invalidate(id)
             return {'message': 'Paciente deletado com sucesso'}, 200
         except Exception as e:
             return {'message': f'Erro ao deletar paciente: {str(e)}'}, 500
@@ -333,15 +693,21 @@ class UpdatePatient(Resource):
         current_user = get_jwt_identity()
         data = request.get_json()
 
+        update, error = validate_payload(PatientUpdateData, data)
+        if error:
+            return error, 400
+        # Apenas os campos enviados são gravados; note pode ser limpo com null
+        changes = update.model_dump(include=update.model_fields_set)
+        if not changes:
+            return {'message': 'Nenhum campo válido para atualização'}, 400
+
         try:
             # Verificar se o paciente pertence ao profissional logado
             check_query = "SELECT id FROM tb_patients WHERE id = %s AND professional_id = %s"
-            result = execute_query(check_query, (id, current_user))
-            if not result:
-                return {'message': 'Paciente não encontrado ou não pertence ao profissional'}, 404
+            checks = [(check_query, (id, current_user))]
 
             # Verificar duplicidade de campos únicos antes da atualização
-            if any(field in data for field in ['email', 'cpf', 'phone']):
+            if any(field in changes for field in ['email', 'cpf', 'phone']):
                 check_duplicates_query = """
                             SELECT email, cpf, phone FROM tb_patients 
                             WHERE id != %s AND (
@@ -350,103 +716,37 @@ class UpdatePatient(Resource):
                                 phone = %s
                             )
                         """
-                duplicate_check = execute_query(
+                checks.append((
                     check_duplicates_query,
                     (
                         id,
-                        data.get('email', ''),
-                        data.get('cpf', ''),
-                        data.get('phone', '')
+                        changes.get('email', ''),
+                        changes.get('cpf', ''),
+                        changes.get('phone', '')
                     )
-                )
+                ))
 
-                if duplicate_check:
-                    duplicate_record = duplicate_check[0]
-                    if 'email' in data and data['email'] == duplicate_record['email']:
-                        return {'message': 'Email já registrado'}, 409
-                    if 'cpf' in data and data['cpf'] == duplicate_record['cpf']:
-                        return {'message': 'CPF já registrado'}, 409
-                    if 'phone' in data and data['phone'] == duplicate_record['phone']:
-                        return {'message': 'Número de telefone já registrado'}, 409
-
-            # Resto do código de validação permanece o mesmo
-            fields_to_update = []
-            values = []
-
-            if 'full_name' in data:
-                full_name = data['full_name']
-                if not full_name or len(full_name.strip()) < 3:
-                    return {'message': 'Nome completo deve ter pelo menos 3 caracteres'}, 400
-                fields_to_update.append('full_name = %s')
-                values.append(full_name)
-
-            if 'birth_date' in data:
-                try:
-                    birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
-                    fields_to_update.append('birth_date = %s')
-                    values.append(birth_date)
-                except ValueError:
-                    return {'message': 'Data de nascimento deve estar no formato YYYY-MM-DD'}, 400
-
-            if 'gender' in data:
-                gender = data['gender']
-                if gender not in ['M', 'F', 'O']:
-                    return {'message': 'Gênero deve ser M, F ou O'}, 400
-                fields_to_update.append('gender = %s')
-                values.append(gender)
-
-            if 'email' in data:
-                email = data['email']
-                if not re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', email):
-                    return {'message': 'Formato de e-mail inválido'}, 400
-                fields_to_update.append('email = %s')
-                values.append(email)
-
-            if 'phone' in data:
-                phone = data['phone']
-                if not re.match(r'^[0-9]{11}$', phone):
-                    return {'message': 'O número de telefone deve ter 11 dígitos numéricos'}, 400
-                fields_to_update.append('phone = %s')
-                values.append(phone)
-
-            if 'cpf' in data:
-                cpf = data['cpf']
-                if not re.match(r'^[0-9]{11}$', cpf):
-                    return {'message': 'CPF deve ter 11 dígitos numéricos'}, 400
-                fields_to_update.append('cpf = %s')
-                values.append(cpf)
-
-            if 'weight' in data:
-                try:
-                    weight = float(data['weight'])
-                    if weight <= 0 or weight > 500:
-                        return {'message': 'Peso deve ser um número positivo e menor que 500'}, 400
-                    fields_to_update.append('weight = %s')
-                    values.append(weight)
-                except (ValueError, TypeError):
-                    return {'message': 'Peso deve ser um número válido'}, 400
-
-            if 'height' in data:
-                try:
-                    height = float(data['height'])
-                    if height <= 0 or height > 3:
-                        return {'message': 'Altura deve ser um número positivo entre 0 e 3'}, 400
-                    fields_to_update.append('height = %s')
-                    values.append(height)
-                except (ValueError, TypeError):
-                    return {'message': 'Altura deve ser um número válido'}, 400
-
-            if 'note' in data:
-                fields_to_update.append('note = %s')
-                values.append(data['note'])
-
-            if not fields_to_update:
-                return {'message': 'Nenhum campo válido para atualização'}, 400
+            # As duas verificações são independentes e rodam ao mesmo tempo
+            result, *duplicate_checks = execute_many_concurrently(checks)
+            if not result:
+                return {'message': 'Paciente não encontrado ou não pertence ao profissional'}, 404
+
+            if duplicate_checks and duplicate_checks[0]:
+                duplicate_record = duplicate_checks[0][0]
+                if 'email' in changes and changes['email'] == duplicate_record['email']:
+                    return {'message': 'Email já registrado'}, 409
+                if 'cpf' in changes and changes['cpf'] == duplicate_record['cpf']:
+                    return {'message': 'CPF já registrado'}, 409
+                if 'phone' in changes and changes['phone'] == duplicate_record['phone']:
+                    return {'message': 'Número de telefone já registrado'}, 409
 
             # Atualizar os dados do paciente
+            fields_to_update = [f"{field} = %s" for field in changes]
+            values = list(changes.values())
             update_query = f"UPDATE tb_patients SET {', '.join(fields_to_update)}, updated_at = NOW() WHERE id = %s"
             values.append(id)
             execute_query(update_query, tuple(values))
+            invalidate_identity('patient', id)
 
             return {'message': 'Dados do paciente atualizados com sucesso'}, 200
 
@@ -457,32 +757,257 @@ class UpdatePatient(Resource):
 
 # Plano Alimentar
 
-class MealPlanFood(BaseModel):
-    food_id: int
-    prescribed_quantity_grams: float = Field(..., gt=0)
-    display_portion: str
-    preparation_notes: Optional[str] = None
-
-class MealPlanEntry(BaseModel):
-    meal_type_name: str
-    day_of_plan: date
-    time_scheduled: str
-    notes: Optional[str] = None
-    foods: List[MealPlanFood]
-
-class MealPlanCreate(BaseModel):
-    patient_id: int
-    plan_name: str
-    start_date: date
-    end_date: date
-    goals: str
-    entries: List[MealPlanEntry]
-
-class MealPlanUpdate(BaseModel):
-    plan_name: Optional[str] = None
-    start_date: Optional[date] = None
-    end_date: Optional[date] = None
-    goals: Optional[str] = None
+def meal_plan_day_key(value):
+    """Normaliza day_of_plan ('2024-6-1', '2024-06-01' ou date) para 'YYYY-MM-DD'"""
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.strptime(str(value).strip(), '%Y-%m-%d').date().isoformat()
+
+
+def meal_plan_time_key(value):
+    """Normaliza time_scheduled ('8:00', '08:00' ou '08:00:00') para 'HH:MM:SS'"""
+    if value in (None, ''):
+        return None
+    parts = [int(part) for part in str(value).strip().split(':')]
+    parts += [0] * (3 - len(parts))
+    return '%02d:%02d:%02d' % tuple(parts[:3])
+
+
+def meal_plan_entry_key(meal_type_name, day_of_plan):
+    """
+    Chave de uq_meal_entry (meal_type_name, day_of_plan) para comparações em Python
+
+    A coluna usa utf8mb4_unicode_ci: 'Almoço' e 'almoco' são a mesma refeição.
+    """
+    return normalize_food_name(meal_type_name), meal_plan_day_key(day_of_plan)
+
+
+def meal_plan_food_rows(entry_id, foods, food_ids):
+    """Linhas de parâmetros para o INSERT multi-linha em tb_meal_plan_foods"""
+    rows = []
+    for food in foods:
+        prescribed_quantity = float(food['prescribed_quantity'])
+        rows.append((
+            entry_id,
+            food_ids[food['food_name']],
+            prescribed_quantity,
+            food['unit_measure'],
+            prescribed_quantity,
+            food.get('preparation_notes')
+        ))
+    return rows
+
+
+def select_meal_plan_entry_ids(tx, meal_plan_id):
+    """
+    Mapa meal_plan_entry_key(meal_type_name, day_of_plan) -> id das entradas do plano
+
+    IDs gerados por um INSERT multi-linha não são necessariamente sequenciais
+    (innodb_autoinc_lock_mode = 2), então são recuperados pela chave única.
+    """
+    entry_ids_query = """
+        SELECT id, meal_type_name, DATE_FORMAT(day_of_plan, '%%Y-%%m-%%d') AS day_of_plan
+        FROM tb_meal_plan_entries
+        WHERE meal_plan_id = %s
+    """
+    return {
+        meal_plan_entry_key(row['meal_type_name'], row['day_of_plan']): row['id']
+        for row in tx.execute(entry_ids_query, (meal_plan_id,))
+    }
+
+
+INSERT_MEAL_PLAN_ENTRY_QUERY = """
+    INSERT INTO tb_meal_plan_entries
+        (meal_plan_id, meal_type_name, day_of_plan, time_scheduled, notes)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+UPSERT_MEAL_PLAN_ENTRY_QUERY = """
+    INSERT INTO tb_meal_plan_entries
+        (meal_plan_id, meal_type_name, day_of_plan, time_scheduled, notes)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE time_scheduled = VALUES(time_scheduled), notes = VALUES(notes)
+"""
+
+INSERT_MEAL_PLAN_FOOD_QUERY = """
+    INSERT INTO tb_meal_plan_foods
+    (meal_plan_entry_id, food_id, prescribed_portion, prescribed_unit_measure, prescribed_quantity_grams, preparation_notes)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def insert_meal_plan_entries(tx, meal_plan_id, entries, food_ids):
+    """
+    Insere entradas e alimentos de um plano com um número fixo de round-trips
+
+    Um INSERT multi-linha para as entradas, um SELECT que recupera os IDs gerados
+    pela chave única (meal_type_name, day_of_plan) e um INSERT multi-linha para
+    os alimentos, independente da quantidade de refeições e alimentos.
+
+    Args:
+        tx (Transaction): Transação aberta
+        meal_plan_id (int): ID do plano alimentar
+        entries (list): Entradas no formato do payload da API
+        food_ids (dict): Mapa food_name -> id em tb_foods
+
+    Returns:
+        dict: meal_plan_entry_key(meal_type_name, day_of_plan) -> id da entrada
+    """
+    tx.execute_many(INSERT_MEAL_PLAN_ENTRY_QUERY, [
+        (
+            meal_plan_id,
+            entry['meal_type_name'],
+            entry['day_of_plan'],
+            entry['time_scheduled'],
+            entry.get('notes')
+        )
+        for entry in entries
+    ])
+
+    entry_ids = select_meal_plan_entry_ids(tx, meal_plan_id)
+
+    food_rows = []
+    for entry in entries:
+        entry_id = entry_ids[meal_plan_entry_key(entry['meal_type_name'], entry['day_of_plan'])]
+        food_rows.extend(meal_plan_food_rows(entry_id, entry['foods'], food_ids))
+    tx.execute_many(INSERT_MEAL_PLAN_FOOD_QUERY, food_rows)
+
+    return entry_ids
+
+
+def apply_meal_plan_entries_diff(tx, meal_plan_id, entries, food_ids):
+    """
+    Aplica ao plano apenas as diferenças entre as entradas enviadas e as gravadas
+
+    As entradas são comparadas pela chave única (meal_type_name, day_of_plan),
+    normalizada como na collation da coluna (meal_plan_entry_key):
+    - entradas gravadas que não foram enviadas são removidas (alimentos em cascata);
+    - entradas novas ou com horário/observações diferentes são gravadas com um único
+      INSERT ... ON DUPLICATE KEY UPDATE multi-linha;
+    - os alimentos só são regravados nas entradas novas ou cuja lista de alimentos mudou.
+
+    Cada etapa é um único statement, então o custo não depende do tamanho do plano.
+    """
+    stored_query = """
+        SELECT
+            mpe.id,
+            mpe.meal_type_name,
+            DATE_FORMAT(mpe.day_of_plan, '%%Y-%%m-%%d') AS day_of_plan,
+            TIME_FORMAT(mpe.time_scheduled, '%%H:%%i:%%s') AS time_scheduled,
+            mpe.notes,
+            mpf.id AS meal_plan_food_id,
+            mpf.food_id,
+            mpf.prescribed_portion,
+            mpf.prescribed_unit_measure,
+            mpf.preparation_notes
+        FROM tb_meal_plan_entries mpe
+        LEFT JOIN tb_meal_plan_foods mpf ON mpf.meal_plan_entry_id = mpe.id
+        WHERE mpe.meal_plan_id = %s
+        ORDER BY mpe.id, mpf.id
+        FOR UPDATE
+    """
+    stored = {}
+    for row in tx.execute(stored_query, (meal_plan_id,)):
+        key = meal_plan_entry_key(row['meal_type_name'], row['day_of_plan'])
+        entry = stored.setdefault(key, {
+            'id': row['id'],
+            'time_scheduled': row['time_scheduled'],
+            'notes': row['notes'],
+            'foods': []
+        })
+        if row['meal_plan_food_id'] is not None:
+            entry['foods'].append((
+                row['food_id'],
+                Decimal(row['prescribed_portion']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                row['prescribed_unit_measure'],
+                row['preparation_notes']
+            ))
+
+    submitted = {}
+    for entry in entries:
+        submitted[meal_plan_entry_key(entry['meal_type_name'], entry['day_of_plan'])] = entry
+
+    deleted_ids = [entry['id'] for key, entry in stored.items() if key not in submitted]
+    upserts = []
+    refill_keys = []
+    for key, entry in submitted.items():
+        current = stored.get(key)
+        # DECIMAL(7,2) arredonda metades para longe do zero (1.005 é gravado como 1.01); com o
+        # ROUND_HALF_EVEN padrão do Decimal, a quantidade enviada nunca seria igual à gravada
+        foods = [
+            (
+                food_ids[food['food_name']],
+                Decimal(str(float(food['prescribed_quantity']))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                food['unit_measure'],
+                food.get('preparation_notes')
+            )
+            for food in entry['foods']
+        ]
+        if current is None:
+            upserts.append(entry)
+            refill_keys.append(key)
+            continue
+        if (current['time_scheduled'] != meal_plan_time_key(entry['time_scheduled'])
+                or current['notes'] != entry.get('notes')):
+            upserts.append(entry)
+        if current['foods'] != foods:
+            refill_keys.append(key)
+
+    if deleted_ids:
+        tx.execute("DELETE FROM tb_meal_plan_entries WHERE id IN %s", (deleted_ids,))
+
+    if upserts:
+        tx.execute_many(
+            UPSERT_MEAL_PLAN_ENTRY_QUERY,
+            [
+                (
+                    meal_plan_id,
+                    entry['meal_type_name'],
+                    entry['day_of_plan'],
+                    entry['time_scheduled'],
+                    entry.get('notes')
+                )
+                for entry in upserts
+            ]
+        )
+
+    if refill_keys:
+        # Entradas novas precisam dos IDs gerados; as existentes já são conhecidas
+        if any(key not in stored for key in refill_keys):
+            entry_ids = select_meal_plan_entry_ids(tx, meal_plan_id)
+        else:
+            entry_ids = {key: entry['id'] for key, entry in stored.items()}
+
+        refill_existing = [entry_ids[key] for key in refill_keys if key in stored]
+        if refill_existing:
+            tx.execute("DELETE FROM tb_meal_plan_foods WHERE meal_plan_entry_id IN %s", (refill_existing,))
+
+        food_rows = []
+        for key in refill_keys:
+            food_rows.extend(meal_plan_food_rows(entry_ids[key], submitted[key]['foods'], food_ids))
+        tx.execute_many(INSERT_MEAL_PLAN_FOOD_QUERY, food_rows)
+
+
+
+def get_owned_meal_plan_id(patient_id, professional_id):
+    """Retorna o id do plano do paciente se ele pertencer ao profissional, senão None"""
+    check_plan_query = """
+        SELECT id FROM tb_patient_meal_plans
+        WHERE patient_id = %s AND professional_id = %s
+    """
+    plan = execute_query(check_plan_query, (patient_id, professional_id))
+    return plan[0]['id'] if plan else None
+
+
+def bump_meal_plan_version(tx, meal_plan_id):
+    """
+    Marca o plano como alterado
+
+    Toda escrita em entradas ou alimentos do plano incrementa version, que
+    compõe a chave dos agregados em cache (app.utils.nutrition) e das
+    respostas do GetMealPlan (app.utils.response_cache).
+    """
+    tx.execute("UPDATE tb_patient_meal_plans SET version = version + 1 WHERE id = %s", (meal_plan_id,))
 
 
 class CreateMealPlan(Resource):
@@ -493,114 +1018,52 @@ class CreateMealPlan(Resource):
         if claims.get('role') != 'professional':
             return {'message': 'Acesso não autorizado'}, 403
 
-        data = request.get_json()
+        # validação: plano, entradas e alimentos em uma única passada do modelo
+        plan, error = validate_payload(MealPlanCreateData, request.get_json())
+        if error:
+            return error, 400
+        data = plan.model_dump()
 
         # verificação: paciente já possui plano alimentar?
-        patient_id = data.get('patient_id')
         check_patient_query = "SELECT id FROM tb_patient_meal_plans WHERE patient_id = %s"
-        existing_plan = execute_query(check_patient_query, (patient_id,))
+        existing_plan = execute_query(check_patient_query, (data['patient_id'],))
         if existing_plan:
             return {'message': 'Este paciente já possui um plano alimentar cadastrado'}, 409
 
-        # validação: campos obrigatórios
-        required_fields = ['patient_id', 'plan_name', 'start_date', 'end_date', 'entries']
-        for field in required_fields:
-            if not data.get(field) or (isinstance(data.get(field), str) and not data.get(field).strip()):
-                return {'message': f"O campo '{field}' é obrigatório e não pode ser vazio"}, 400
-
-        if not isinstance(data['entries'], list) or not data['entries']:
-            return {'message': 'entries deve ser uma lista não vazia'}, 400
-
-        # validação: existência dos alimentos
-        for idx, entry in enumerate(data['entries']):
-            for field in ['meal_type_name', 'day_of_plan', 'time_scheduled', 'foods']:
-                if not entry.get(field) or (isinstance(entry.get(field), str) and not entry.get(field).strip()):
-                    return {'message': f"O campo '{field}' é obrigatório e não pode ser vazio"}, 400
-
-            if not isinstance(entry['foods'], list) or not entry['foods']:
-                return {'message': f"Alimentos é obrigatório na entrada {idx+1} e não pode ser vazio"}, 400
-
-            for fidx, food in enumerate(entry['foods']):
-                for field in ['food_name', 'prescribed_quantity', 'unit_measure', 'energy_value_kcal']:
-                    if food.get(field) in [None, ""]:
-                        return {'message': f"O campo '{field}' é obrigatório no alimento {fidx+1} da entrada {idx+1} e não pode ser vazio"}, 400
-
-                # Checagem de existência do alimento
-                food_name = food['food_name']
-                food_id_query = "SELECT id FROM tb_foods WHERE name = %s"
-                food_id_result = execute_query(food_id_query, (food_name,))
-                if not food_id_result:
-                    return {'message': f"Alimento '{food_name}' não encontrado no banco de dados"}, 400
+        # validação: existência dos alimentos (resolvida pelo catálogo em memória)
+        food_ids, missing_foods = food_catalog.resolve_ids(
+            food['food_name'] for entry in data['entries'] for food in entry['foods']
+        )
+        if missing_foods:
+            return {'message': f"Alimento '{missing_foods[0]}' não encontrado no banco de dados"}, 400
 
         try:
-            # cria plano alimentar
-            insert_meal_plan_query = """
-                INSERT INTO tb_patient_meal_plans
-                    (patient_id, professional_id, plan_name, start_date, end_date, goals)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            meal_plan_id = execute_query(
-                insert_meal_plan_query,
-                (
-                    data['patient_id'],
-                    current_user,
-                    data['plan_name'],
-                    data['start_date'],
-                    data['end_date'],
-                    data['goals']
-                ),
-                return_id=True
-            )
-
-            if not meal_plan_id:
-                return {'message': 'Erro ao criar plano alimentar'}, 500
-
-            for entry in data['entries']:
-                insert_entry_query = """
-                    INSERT INTO tb_meal_plan_entries
-                        (meal_plan_id, meal_type_name, day_of_plan, time_scheduled, notes, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
+            # Todo o plano é gravado em uma única transação (um commit por requisição)
+            with transaction() as tx:
+                # cria plano alimentar
+                insert_meal_plan_query = """
+                    INSERT INTO tb_patient_meal_plans
+                        (patient_id, professional_id, plan_name, start_date, end_date, goals)
+                    VALUES (%s, %s, %s, %s, %s, %s)
                 """
-                entry_id = execute_query(
-                    insert_entry_query,
+                meal_plan_id = tx.execute(
+                    insert_meal_plan_query,
                     (
-                        meal_plan_id,
-                        entry['meal_type_name'],
-                        entry['day_of_plan'],
-                        entry['time_scheduled'],
-                        entry.get('notes')
+                        data['patient_id'],
+                        current_user,
+                        data['plan_name'],
+                        data['start_date'],
+                        data['end_date'],
+                        data['goals']
                     ),
                     return_id=True
                 )
 
-                if not entry_id:
-                    return {'message': 'Erro ao criar entrada do plano alimentar'}, 500
-
-                for food in entry['foods']:
-                    # Buscar o food_id pelo food_name
-                    food_id_query = "SELECT id FROM tb_foods WHERE name = %s"
-                    food_id_result = execute_query(food_id_query, (food['food_name'],))
-                    food_id = food_id_result[0]['id']
+                if not meal_plan_id:
+                    raise RuntimeError('ID do plano alimentar não retornado pelo banco')
 
-                    prescribed_quantity = float(food['prescribed_quantity'])
-                    unit_measure = food['unit_measure']
-
-                    insert_food_query = """
-                        INSERT INTO tb_meal_plan_foods
-                        (meal_plan_entry_id, food_id, prescribed_portion, prescribed_unit_measure, prescribed_quantity_grams, preparation_notes, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
-                    """
-                    execute_query(
-                        insert_food_query,
-                        (
-                            entry_id,
-                            food_id,
-                            prescribed_quantity,
-                            unit_measure,
-                            prescribed_quantity,
-                            food.get('preparation_notes')
-                        )
-                    )
+                insert_meal_plan_entries(tx, meal_plan_id, data['entries'], food_ids)
+            meal_plan_cache.invalidate(data['patient_id'])
 
             return {'message': 'Plano alimentar criado com sucesso', 'meal_plan_id': meal_plan_id}, 201
 
@@ -609,9 +1072,73 @@ class CreateMealPlan(Resource):
             return {'message': f'Erro ao criar plano alimentar: {str(e)}'}, 500
 
 
+def group_meal_plan_rows(rows):
+    """
+    Monta a lista de entradas (cada uma com seus alimentos) a partir das linhas
+    de tb_meal_plan_entries LEFT JOIN tb_meal_plan_foods, já ordenadas por entrada
+    """
+    entries = []
+    entries_by_id = {}
+    for row in rows:
+        entry = entries_by_id.get(row['id'])
+        if entry is None:
+            entry = {
+                'id': row['id'],
+                'meal_type_name': row['meal_type_name'],
+                'day_of_plan': row['day_of_plan'],
+                'time_scheduled': row['time_scheduled'],
+                'notes': row['notes'],
+                'foods': []
+            }
+            entries_by_id[row['id']] = entry
+            entries.append(entry)
+
+        # Entrada sem alimentos: o LEFT JOIN retorna uma linha com colunas de alimento nulas
+        if row['meal_plan_food_id'] is None:
+            continue
+        entry['foods'].append({
+            "id": row['meal_plan_food_id'],
+            "food_name": row['food_name'],
+            "prescribed_quantity": row['prescribed_quantity'],
+            "unit_measure": row['unit_measure'],
+            "energy_value_kcal": row['energy_value_kcal'],
+            "preparation_notes": row['preparation_notes']
+        })
+    return entries
+
+
+def parse_meal_plan_window(args):
+    """
+    Lê a janela de datas (from/to ou day) da query string do GetMealPlan
+
+    Returns:
+        tuple: ((from 'YYYY-MM-DD' ou None, to 'YYYY-MM-DD' ou None), None) ou (None, mensagem de erro)
+    """
+    day = args.get('day')
+    if day is not None and (args.get('from') is not None or args.get('to') is not None):
+        return None, 'Use day ou from/to, não ambos'
+
+    bounds = {'from': day, 'to': day} if day is not None else {'from': args.get('from'), 'to': args.get('to')}
+    for name, value in bounds.items():
+        if value is None:
+            continue
+        try:
+            bounds[name] = meal_plan_day_key(value)
+        except ValueError:
+            return None, f"{'day' if day is not None else name} deve estar no formato YYYY-MM-DD"
+
+    if bounds['from'] and bounds['to'] and bounds['from'] > bounds['to']:
+        return None, 'from deve ser anterior ou igual a to'
+    return (bounds['from'], bounds['to']), None
+
+
 class GetMealPlan(Resource):
     @jwt_required()
     def get(self, patient_id):
+        window, error = parse_meal_plan_window(request.args)
+        if error:
+            return {'message': error}, 400
+
         try:
             current_user = get_jwt_identity()
             claims = get_jwt()
@@ -619,11 +1146,8 @@ class GetMealPlan(Resource):
             plan_query = """
                 SELECT 
                     id, patient_id, professional_id, plan_name,
-                    DATE_FORMAT(start_date, '%%Y-%%m-%%d') as start_date,
-                    DATE_FORMAT(end_date, '%%Y-%%m-%%d') as end_date,
-                    goals,
-                    DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%s') as created_at,
-                    DATE_FORMAT(updated_at, '%%Y-%%m-%%d %%H:%%i:%%s') as updated_at
+                    start_date, end_date, goals, version,
+                    created_at, updated_at
                 FROM tb_patient_meal_plans
                 WHERE patient_id = %s
                 LIMIT 1
@@ -640,53 +1164,182 @@ class GetMealPlan(Resource):
             if claims.get('role') == 'patient' and plan_info['patient_id'] != int(current_user):
                 return {'message': 'Acesso não autorizado'}, 403
 
-            # Busca todas as entradas do plano alimentar
-            entries_query = """
+            # Resposta em cache para esta versão do plano (as permissões acima valem também para acertos)
+            cached = meal_plan_cache.get(patient_id, plan_info['id'], plan_info['version'], window)
+            if cached is not None:
+                return {'meal_plan': cached}, 200
+
+            # Janela opcional de dias: usa o índice (meal_plan_id, day_of_plan, time_scheduled),
+            # então o custo acompanha o tamanho da janela e não a duração do plano
+            window_conditions = []
+            window_params = []
+            if window[0]:
+                window_conditions.append("AND mpe.day_of_plan >= %s")
+                window_params.append(window[0])
+            if window[1]:
+                window_conditions.append("AND mpe.day_of_plan <= %s")
+                window_params.append(window[1])
+
+            # Busca entradas e alimentos do plano em uma única query
+            entries_query = f"""
                 SELECT 
                     mpe.id, 
                     mpe.meal_type_name,
-                    DATE_FORMAT(mpe.day_of_plan, '%%Y-%%m-%%d') as day_of_plan,
+                    mpe.day_of_plan,
                     TIME_FORMAT(mpe.time_scheduled, '%%H:%%i') as time_scheduled,
-                    mpe.notes
+                    mpe.notes,
+                    mpf.id as meal_plan_food_id,
+                    f.name as food_name,
+                    mpf.prescribed_quantity_grams as prescribed_quantity,
+                    mpf.prescribed_unit_measure as unit_measure,
+                    f.energy_value_kcal,
+                    mpf.preparation_notes
                 FROM tb_meal_plan_entries mpe
+                LEFT JOIN tb_meal_plan_foods mpf ON mpf.meal_plan_entry_id = mpe.id
+                LEFT JOIN tb_foods f ON mpf.food_id = f.id
                 WHERE mpe.meal_plan_id = %s
-                ORDER BY mpe.day_of_plan, mpe.time_scheduled
+                {' '.join(window_conditions)}
+                ORDER BY mpe.day_of_plan, mpe.time_scheduled, mpe.id, mpf.id
             """
-            entries = execute_query(entries_query, (plan_info['id'],))
-
-            for entry in entries:
-                foods_query = """
-                    SELECT 
-                        f.name as food_name,
-                        mpf.prescribed_quantity_grams as prescribed_quantity,
-                        mpf.prescribed_unit_measure as unit_measure,
-                        f.energy_value_kcal,
-                        mpf.preparation_notes
-                    FROM tb_meal_plan_foods mpf
-                    JOIN tb_foods f ON mpf.food_id = f.id
-                    WHERE mpf.meal_plan_entry_id = %s
-                """
-                foods_result = execute_query(foods_query, (entry['id'],))
-                foods = []
-                for food in foods_result:
-                    foods.append({
-                        "food_name": food['food_name'],
-                        "prescribed_quantity": float(food['prescribed_quantity']) if food['prescribed_quantity'] is not None else None,
-                        "unit_measure": food['unit_measure'],
-                        "energy_value_kcal": float(food['energy_value_kcal']) if food['energy_value_kcal'] is not None else None,
-                        "preparation_notes": food['preparation_notes']
-                    })
-                entry['foods'] = foods
+            rows = execute_query(entries_query, (plan_info['id'], *window_params))
+            entries = group_meal_plan_rows(rows)
 
             plan_info['entries'] = entries
+            meal_plan_cache.set(patient_id, plan_info['id'], plan_info['version'], window, plan_info)
 
-            return {'meal_plan': convert_decimal(plan_info)}, 200
+            return {'meal_plan': plan_info}, 200
 
         except Exception as e:
             logger.error(f"Erro ao obter plano alimentar: {str(e)}", exc_info=True)
             return {'message': f'Erro ao obter plano alimentar: {str(e)}'}, 500
 
 
+class MealPlanSummary(Resource):
+    """Totais calóricos do plano por refeição, por dia e do plano, sem as linhas de alimentos"""
+
+    @jwt_required()
+    def get(self, patient_id):
+        window, error = parse_meal_plan_window(request.args)
+        if error:
+            return {'message': error}, 400
+
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+
+            plan_query = """
+                SELECT id, patient_id, professional_id, version
+                FROM tb_patient_meal_plans
+                WHERE patient_id = %s
+                LIMIT 1
+            """
+            plan_result = execute_query(plan_query, (patient_id,))
+            if not plan_result:
+                return {'message': 'Plano alimentar não encontrado'}, 404
+
+            plan_info = plan_result[0]
+
+            # Mesmas permissões do GetMealPlan
+            if claims.get('role') == 'professional' and plan_info['professional_id'] != int(current_user):
+                return {'message': 'Acesso não autorizado'}, 403
+            if claims.get('role') == 'patient' and plan_info['patient_id'] != int(current_user):
+                return {'message': 'Acesso não autorizado'}, 403
+
+            totals = get_meal_plan_totals(plan_info['id'], plan_info['version'], window)
+
+            return {
+                'meal_plan_id': plan_info['id'],
+                'version': plan_info['version'],
+                **totals
+            }, 200
+
+        except Exception as e:
+            logger.error(f"Erro ao obter resumo do plano alimentar: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao obter resumo do plano alimentar: {str(e)}'}, 500
+
+
+class ProfessionalDashboard(Resource):
+    """
+    Resumo de todos os pacientes do profissional com a situação do plano alimentar
+
+    Carregado com duas queries (pacientes + planos e totais calóricos de todos
+    os planos), independente da quantidade de pacientes.
+    """
+
+    @jwt_required()
+    def get(self, professional_id):
+        current_user = get_jwt_identity()
+        claims = get_jwt()
+        if claims.get('role') != 'professional' or int(current_user) != professional_id:
+            return {'message': 'Acesso não autorizado'}, 403
+
+        try:
+            patients_query = """
+                SELECT
+                    p.id,
+                    p.full_name,
+                    mp.id AS meal_plan_id,
+                    mp.plan_name,
+                    mp.start_date,
+                    mp.end_date,
+                    (mp.start_date <= CURDATE() AND (mp.end_date IS NULL OR mp.end_date >= CURDATE())) AS active
+                FROM tb_patients p
+                LEFT JOIN tb_patient_meal_plans mp ON mp.patient_id = p.id
+                WHERE p.professional_id = %s
+                ORDER BY p.full_name, p.id, mp.id
+            """
+            rows = execute_query(patients_query, (professional_id,))
+
+            # Calorias de todos os planos do profissional em uma única agregação
+            kcal_query = """
+                SELECT
+                    mpe.meal_plan_id,
+                    COUNT(DISTINCT mpe.day_of_plan) AS days,
+                    COALESCE(SUM(f.energy_value_kcal * mpf.prescribed_portion), 0) AS total_kcal
+                FROM tb_patient_meal_plans mp
+                JOIN tb_meal_plan_entries mpe ON mpe.meal_plan_id = mp.id
+                LEFT JOIN tb_meal_plan_foods mpf ON mpf.meal_plan_entry_id = mpe.id
+                LEFT JOIN tb_foods f ON mpf.food_id = f.id
+                WHERE mp.professional_id = %s
+                GROUP BY mpe.meal_plan_id
+            """
+            kcal_by_plan = {
+                row['meal_plan_id']: round(float(row['total_kcal']) / row['days'], 2)
+                for row in execute_query(kcal_query, (professional_id,))
+            }
+
+            patients = []
+            seen = set()
+            for row in rows:
+                # Um paciente tem no máximo um plano (CreateMealPlan); mantém o primeiro se houver mais
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+
+                meal_plan = None
+                if row['meal_plan_id'] is not None:
+                    meal_plan = {
+                        'id': row['meal_plan_id'],
+                        'plan_name': row['plan_name'],
+                        'start_date': row['start_date'],
+                        'end_date': row['end_date'],
+                        'active': bool(row['active']),
+                        'kcal_per_day': kcal_by_plan.get(row['meal_plan_id'], 0.0)
+                    }
+                patients.append({
+                    'id': row['id'],
+                    'full_name': row['full_name'],
+                    'has_active_plan': bool(meal_plan and meal_plan['active']),
+                    'meal_plan': meal_plan
+                })
+
+            return {'professional_id': professional_id, 'patients': patients}, 200
+
+        except Exception as e:
+            logger.error(f"Erro ao obter painel do profissional: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao obter painel do profissional: {str(e)}'}, 500
+
+
 class UpdateMealPlan(Resource):
     @jwt_required()
     def put(self, patient_id):
@@ -696,84 +1349,45 @@ class UpdateMealPlan(Resource):
             if claims.get('role') != 'professional':
                 return {'message': 'Acesso não autorizado'}, 403
 
-            data = request.get_json()
+            update, error = validate_payload(MealPlanUpdateData, request.get_json())
+            if error:
+                return error, 400
+            data = update.model_dump()
 
-            check_plan_query = """
-                SELECT id FROM tb_patient_meal_plans
-                WHERE patient_id = %s AND professional_id = %s
-            """
-            plan = execute_query(check_plan_query, (patient_id, current_user))
-            if not plan:
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
                 return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
 
-            meal_plan_id = plan[0]['id']
-
-            update_fields = []
-            update_values = []
-            for field in ['plan_name', 'start_date', 'end_date', 'goals']:
-                if data.get(field) is not None:
-                    update_fields.append(f"{field} = %s")
-                    update_values.append(data[field])
-            if update_fields:
+            # Resolve os alimentos antes de alterar qualquer linha, para não gravar um plano pela metade
+            food_ids = {}
+            if data['entries'] is not None:
+                food_ids, missing_foods = food_catalog.resolve_ids(
+                    food['food_name'] for entry in data['entries'] for food in entry['foods']
+                )
+                if missing_foods:
+                    return {'message': f"Alimento '{missing_foods[0]}' não encontrado no banco de dados"}, 400
+
+            with transaction() as tx:
+                update_fields = []
+                update_values = []
+                for field in ['plan_name', 'start_date', 'end_date', 'goals']:
+                    if data.get(field) is not None:
+                        update_fields.append(f"{field} = %s")
+                        update_values.append(data[field])
+                # A versão é incrementada no mesmo UPDATE dos campos do plano
+                update_fields.append("version = version + 1")
                 update_query = f"""
                     UPDATE tb_patient_meal_plans
                     SET {', '.join(update_fields)}, updated_at = NOW()
                     WHERE id = %s
                 """
                 update_values.append(meal_plan_id)
-                execute_query(update_query, tuple(update_values))
-
-            # Atualizar entradas e alimentos (entries)
-            if 'entries' in data and isinstance(data['entries'], list):
-                # Remove todas as entradas e alimentos antigos
-                get_entries_query = "SELECT id FROM tb_meal_plan_entries WHERE meal_plan_id = %s"
-                old_entries = execute_query(get_entries_query, (meal_plan_id,))
-                for entry in old_entries:
-                    execute_query("DELETE FROM tb_meal_plan_foods WHERE meal_plan_entry_id = %s", (entry['id'],))
-                execute_query("DELETE FROM tb_meal_plan_entries WHERE meal_plan_id = %s", (meal_plan_id,))
-
-                # Insere as novas entradas e alimentos
-                for entry in data['entries']:
-                    insert_entry_query = """
-                        INSERT INTO tb_meal_plan_entries
-                            (meal_plan_id, meal_type_name, day_of_plan, time_scheduled, notes, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
-                    """
-                    entry_id = execute_query(
-                        insert_entry_query,
-                        (
-                            meal_plan_id,
-                            entry['meal_type_name'],
-                            entry['day_of_plan'],
-                            entry['time_scheduled'],
-                            entry.get('notes')
-                        ),
-                        return_id=True
-                    )
-                    for food in entry['foods']:
-                        food_id_query = "SELECT id FROM tb_foods WHERE name = %s"
-                        food_id_result = execute_query(food_id_query, (food['food_name'],))
-                        if not food_id_result:
-                            return {'message': f"Alimento '{food['food_name']}' não encontrado no banco de dados"}, 400
-                        food_id = food_id_result[0]['id']
-                        prescribed_quantity = float(food['prescribed_quantity'])
-                        unit_measure = food['unit_measure']
-                        insert_food_query = """
-                            INSERT INTO tb_meal_plan_foods
-                            (meal_plan_entry_id, food_id, prescribed_portion, prescribed_unit_measure, prescribed_quantity_grams, preparation_notes, created_at, updated_at)
-                            VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
-                        """
-                        execute_query(
-                            insert_food_query,
-                            (
-                                entry_id,
-                                food_id,
-                                prescribed_quantity,
-                                unit_measure,
-                                prescribed_quantity,
-                                food.get('preparation_notes')
-                            )
-                        )
+                tx.execute(update_query, tuple(update_values))
+
+                # Atualizar entradas e alimentos (entries): grava apenas o que mudou
+                if data['entries'] is not None:
+                    apply_meal_plan_entries_diff(tx, meal_plan_id, data['entries'], food_ids)
+            meal_plan_cache.invalidate(patient_id)
 
             return {'message': 'Plano alimentar atualizado com sucesso'}, 200
 
@@ -791,38 +1405,298 @@ class DeleteMealPlan(Resource):
             if claims.get('role') != 'professional':
                 return {'message': 'Acesso não autorizado'}, 403
 
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+
+            with transaction() as tx:
+                # Deletar alimentos das refeições do plano
+                delete_foods_query = """
+                    DELETE mpf FROM tb_meal_plan_foods mpf
+                    JOIN tb_meal_plan_entries mpe ON mpf.meal_plan_entry_id = mpe.id
+                    WHERE mpe.meal_plan_id = %s
+                """
+                tx.execute(delete_foods_query, (meal_plan_id,))
+
+                # Deletar refeições do plano
+                delete_entries_query = "DELETE FROM tb_meal_plan_entries WHERE meal_plan_id = %s"
+                tx.execute(delete_entries_query, (meal_plan_id,))
+
+                # Deletar o plano
+                delete_query = "DELETE FROM tb_patient_meal_plans WHERE id = %s"
+                tx.execute(delete_query, (meal_plan_id,))
+            meal_plan_cache.invalidate(patient_id)
+
+            return {'message': 'Plano alimentar deletado com sucesso'}, 200
+
+        except Exception as e:
+            logger.error(f"Erro ao deletar plano alimentar: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao deletar plano alimentar: {str(e)}'}, 500
+
+
+def is_duplicate_entry_error(error):
+    return isinstance(error, pymysql.err.IntegrityError) and error.args and error.args[0] == 1062
+
+
+def get_meal_plan_entry_id(meal_plan_id, entry_id):
+    """Retorna entry_id se a entrada pertencer ao plano, senão None"""
+    query = "SELECT id FROM tb_meal_plan_entries WHERE id = %s AND meal_plan_id = %s"
+    return entry_id if execute_query(query, (entry_id, meal_plan_id)) else None
+
+
+class MealPlanEntries(Resource):
+    """Adiciona uma única refeição (com seus alimentos) ao plano, sem reenviar o plano inteiro"""
+
+    @jwt_required()
+    def post(self, patient_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
+
+            entry, error = validate_payload(MealPlanEntryData, request.get_json())
+            if error:
+                return error, 400
+            entry = entry.model_dump()
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+
+            food_ids, missing_foods = food_catalog.resolve_ids(food['food_name'] for food in entry['foods'])
+            if missing_foods:
+                return {'message': f"Alimento '{missing_foods[0]}' não encontrado no banco de dados"}, 400
+
+            with transaction() as tx:
+                entry_id = tx.execute(
+                    INSERT_MEAL_PLAN_ENTRY_QUERY,
+                    (meal_plan_id, entry['meal_type_name'], entry['day_of_plan'], entry['time_scheduled'], entry.get('notes')),
+                    return_id=True
+                )
+                if not entry_id:
+                    raise RuntimeError('ID da refeição não retornado pelo banco')
+                tx.execute_many(INSERT_MEAL_PLAN_FOOD_QUERY, meal_plan_food_rows(entry_id, entry['foods'], food_ids))
+                bump_meal_plan_version(tx, meal_plan_id)
+
+            return {'message': 'Refeição adicionada com sucesso', 'entry_id': entry_id}, 201
+
+        except Exception as e:
+            if is_duplicate_entry_error(e):
+                return {'message': 'Já existe uma entrada para esta refeição neste dia'}, 409
+            logger.error(f"Erro ao adicionar refeição: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao adicionar refeição: {str(e)}'}, 500
+
+
+class MealPlanEntryResource(Resource):
+    """Atualiza ou remove uma única refeição do plano"""
+
+    @jwt_required()
+    def patch(self, patient_id, entry_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
 
-            check_plan_query = """
-                SELECT id FROM tb_patient_meal_plans
-                WHERE patient_id = %s AND professional_id = %s
+            patch, error = validate_payload(MealPlanEntryPatchData, request.get_json())
+            if error:
+                return error, 400
+            changes = patch.model_dump(include=patch.model_fields_set)
+            if not changes:
+                return {'message': 'Nenhum campo para atualizar'}, 400
+            update_fields = [f"{field} = %s" for field in changes]
+            update_values = list(changes.values())
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+
+            # O rowcount do UPDATE não conta linhas sem alteração, então a existência é verificada antes
+            if not get_meal_plan_entry_id(meal_plan_id, entry_id):
+                return {'message': 'Refeição não encontrada no plano alimentar'}, 404
+
+            update_query = f"""
+                UPDATE tb_meal_plan_entries
+                SET {', '.join(update_fields)}
+                WHERE id = %s AND meal_plan_id = %s
             """
-            plan = execute_query(check_plan_query, (patient_id, current_user))
-            if not plan:
+            with transaction() as tx:
+                tx.execute(update_query, tuple(update_values) + (entry_id, meal_plan_id))
+                bump_meal_plan_version(tx, meal_plan_id)
+
+            return {'message': 'Refeição atualizada com sucesso'}, 200
+
+        except Exception as e:
+            if is_duplicate_entry_error(e):
+                return {'message': 'Já existe uma entrada para esta refeição neste dia'}, 409
+            logger.error(f"Erro ao atualizar refeição: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao atualizar refeição: {str(e)}'}, 500
+
+    @jwt_required()
+    def delete(self, patient_id, entry_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
                 return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
 
-            meal_plan_id = plan[0]['id']
+            # Os alimentos da refeição são removidos em cascata (FK ON DELETE CASCADE)
+            delete_query = "DELETE FROM tb_meal_plan_entries WHERE id = %s AND meal_plan_id = %s"
+            with transaction() as tx:
+                deleted = tx.execute(delete_query, (entry_id, meal_plan_id))
+                if deleted:
+                    bump_meal_plan_version(tx, meal_plan_id)
+            if not deleted:
+                return {'message': 'Refeição não encontrada no plano alimentar'}, 404
 
-            # Deletar alimentos das refeições do plano
-            delete_foods_query = """
-                DELETE mpf FROM tb_meal_plan_foods mpf
+            return {'message': 'Refeição removida com sucesso'}, 200
+
+        except Exception as e:
+            logger.error(f"Erro ao remover refeição: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao remover refeição: {str(e)}'}, 500
+
+
+class MealPlanEntryFoods(Resource):
+    """Adiciona um único alimento a uma refeição do plano"""
+
+    @jwt_required()
+    def post(self, patient_id, entry_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
+
+            food, error = validate_payload(MealPlanFoodData, request.get_json())
+            if error:
+                return error, 400
+            food = food.model_dump()
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+            if not get_meal_plan_entry_id(meal_plan_id, entry_id):
+                return {'message': 'Refeição não encontrada no plano alimentar'}, 404
+
+            food_ids, missing_foods = food_catalog.resolve_ids([food['food_name']])
+            if missing_foods:
+                return {'message': f"Alimento '{missing_foods[0]}' não encontrado no banco de dados"}, 400
+
+            with transaction() as tx:
+                food_row_id = tx.execute(
+                    INSERT_MEAL_PLAN_FOOD_QUERY,
+                    meal_plan_food_rows(entry_id, [food], food_ids)[0],
+                    return_id=True
+                )
+                bump_meal_plan_version(tx, meal_plan_id)
+
+            return {'message': 'Alimento adicionado com sucesso', 'food_id': food_row_id}, 201
+
+        except Exception as e:
+            logger.error(f"Erro ao adicionar alimento: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao adicionar alimento: {str(e)}'}, 500
+
+
+class MealPlanFoodResource(Resource):
+    """Atualiza ou remove um único alimento de uma refeição do plano"""
+
+    @jwt_required()
+    def patch(self, patient_id, entry_id, food_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
+
+            patch, error = validate_payload(MealPlanFoodPatchData, request.get_json())
+            if error:
+                return error, 400
+            data = patch.model_dump(include=patch.model_fields_set)
+
+            update_fields = []
+            update_values = []
+            if 'food_name' in data:
+                food_ids, missing_foods = food_catalog.resolve_ids([data['food_name']])
+                if missing_foods:
+                    return {'message': f"Alimento '{missing_foods[0]}' não encontrado no banco de dados"}, 400
+                update_fields.append("mpf.food_id = %s")
+                update_values.append(food_ids[data['food_name']])
+            if 'prescribed_quantity' in data:
+                # Mesma regra de meal_plan_food_rows: a quantidade prescrita preenche porção e gramas
+                prescribed_quantity = data['prescribed_quantity']
+                update_fields += ["mpf.prescribed_portion = %s", "mpf.prescribed_quantity_grams = %s"]
+                update_values += [prescribed_quantity, prescribed_quantity]
+            if 'unit_measure' in data:
+                update_fields.append("mpf.prescribed_unit_measure = %s")
+                update_values.append(data['unit_measure'])
+            if 'preparation_notes' in data:
+                update_fields.append("mpf.preparation_notes = %s")
+                update_values.append(data['preparation_notes'])
+            if not update_fields:
+                return {'message': 'Nenhum campo para atualizar'}, 400
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+
+            check_food_query = """
+                SELECT mpf.id
+                FROM tb_meal_plan_foods mpf
                 JOIN tb_meal_plan_entries mpe ON mpf.meal_plan_entry_id = mpe.id
-                WHERE mpe.meal_plan_id = %s
+                WHERE mpf.id = %s AND mpe.id = %s AND mpe.meal_plan_id = %s
             """
-            execute_query(delete_foods_query, (meal_plan_id,))
+            if not execute_query(check_food_query, (food_id, entry_id, meal_plan_id)):
+                return {'message': 'Alimento não encontrado na refeição'}, 404
 
-            # Deletar refeições do plano
-            delete_entries_query = "DELETE FROM tb_meal_plan_entries WHERE meal_plan_id = %s"
-            execute_query(delete_entries_query, (meal_plan_id,))
+            update_query = f"""
+                UPDATE tb_meal_plan_foods mpf
+                SET {', '.join(update_fields)}
+                WHERE mpf.id = %s AND mpf.meal_plan_entry_id = %s
+            """
+            with transaction() as tx:
+                tx.execute(update_query, tuple(update_values) + (food_id, entry_id))
+                bump_meal_plan_version(tx, meal_plan_id)
 
-            # Deletar o plano
-            delete_query = "DELETE FROM tb_patient_meal_plans WHERE id = %s"
-            execute_query(delete_query, (meal_plan_id,))
+            return {'message': 'Alimento atualizado com sucesso'}, 200
 
-            return {'message': 'Plano alimentar deletado com sucesso'}, 200
+        except Exception as e:
+            logger.error(f"Erro ao atualizar alimento: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao atualizar alimento: {str(e)}'}, 500
+
+    @jwt_required()
+    def delete(self, patient_id, entry_id, food_id):
+        try:
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+            if claims.get('role') != 'professional':
+                return {'message': 'Acesso não autorizado'}, 403
+
+            meal_plan_id = get_owned_meal_plan_id(patient_id, current_user)
+            if not meal_plan_id:
+                return {'message': 'Plano alimentar não encontrado ou não pertence ao profissional'}, 404
+
+            delete_query = """
+                DELETE mpf FROM tb_meal_plan_foods mpf
+                JOIN tb_meal_plan_entries mpe ON mpf.meal_plan_entry_id = mpe.id
+                WHERE mpf.id = %s AND mpe.id = %s AND mpe.meal_plan_id = %s
+            """
+            with transaction() as tx:
+                deleted = tx.execute(delete_query, (food_id, entry_id, meal_plan_id))
+                if deleted:
+                    bump_meal_plan_version(tx, meal_plan_id)
+            if not deleted:
+                return {'message': 'Alimento não encontrado na refeição'}, 404
+
+            return {'message': 'Alimento removido com sucesso'}, 200
 
         except Exception as e:
-            logger.error(f"Erro ao deletar plano alimentar: {str(e)}", exc_info=True)
-            return {'message': f'Erro ao deletar plano alimentar: {str(e)}'}, 500
+            logger.error(f"Erro ao remover alimento: {str(e)}", exc_info=True)
+            return {'message': f'Erro ao remover alimento: {str(e)}'}, 500
 
 
 
@@ -833,38 +1707,25 @@ class FoodList(Resource):
             current_user = get_jwt_identity()
             claims = get_jwt()
 
-            query = """
-                SELECT 
-                    id,
-                    name,
-                    food_group_name,
-                    default_portion_grams,
-                    energy_value_kcal,
-                    portion,
-                    unit_measure
-                FROM tb_foods
-                ORDER BY id ASC
-            """
-
-            foods = execute_query(query)
-
-            result = []
-            for food in foods:
-                default_portion = {
-                    "grams": float(food['default_portion_grams']) if food['default_portion_grams'] is not None else None,
-                    "energy_value_kcal": float(food['energy_value_kcal']) if food['energy_value_kcal'] is not None else None,
-                    "portion": float(food['portion']) if food['portion'] is not None else None,
-                    "unit_measure": food['unit_measure']
-                }
-                formatted_food = {
-                    "id": food['id'],
-                    "name": food['name'],
-                    "food_group": food['food_group_name'],
-                    "default_portion": default_portion
-                }
-                result.append(formatted_food)
+            catalog = food_catalog.get()
 
-            return result, 200
+            # O corpo é pré-serializado (e pré-comprimido) por versão do catálogo; If-None-Match
+            # é respondido com 304 direto da memória, sem consultar o MySQL nem serializar de novo
+            if request.if_none_match.contains_weak(catalog.version):
+                response = Response(status=304)
+            else:
+                encoding = negotiate_encoding(len(catalog.body))
+                if encoding:
+                    response = Response(catalog.encoded_body(encoding), mimetype='application/json')
+                    response.headers['Content-Encoding'] = encoding
+                else:
+                    response = Response(catalog.body, mimetype='application/json')
+            # ETag fraco: a mesma versão é servida com e sem compressão. O 304 repete o
+            # Vary da resposta 200 (o after_request de compressão ignora respostas 304)
+            response.set_etag(catalog.version, weak=True)
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = f'private, max-age={int(food_catalog.ttl)}'
+            return response
 
         except Exception as e:
             logger.error(f"Erro ao listar alimentos: {str(e)}", exc_info=True)
@@ -891,28 +1752,33 @@ class ProfessionalDetails(Resource):
                     phone,
                     regional_council_type,
                     regional_council,
-                    DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS created_at,
-                    DATE_FORMAT(updated_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS updated_at
+                    created_at,
+                    updated_at
                 FROM tb_professionals
                 WHERE id = %s
             """
-            professional = execute_query(query, (current_user,))
 
-            if not professional:
-                return {'message': 'Profissional não encontrado'}, 404
+            def load_professional():
+                professional = execute_query(query, (current_user,))
+                if not professional:
+                    return None
+
+                # Formatar os dados de retorno
+                return {
+                    'id': str(professional[0]['id']),
+                    'full_name': professional[0]['full_name'],
+                    'email': professional[0]['email'],
+                    'cpf': professional[0]['cpf'],
+                    'phone': professional[0]['phone'],
+                    'regional_council_type': professional[0]['regional_council_type'],
+                    'regional_council': professional[0]['regional_council'],
+                    'created_at': professional[0]['created_at'],
+                    'updated_at': professional[0]['updated_at']
+                }
 
-            # Formatar os dados de retorno
-            professional_data = {
-                'id': str(professional[0]['id']),
-                'full_name': professional[0]['full_name'],
-                'email': professional[0]['email'],
-                'cpf': professional[0]['cpf'],
-                'phone': professional[0]['phone'],
-                'regional_council_type': professional[0]['regional_council_type'],
-                'regional_council': professional[0]['regional_council'],
-                'created_at': professional[0]['created_at'],
-                'updated_at': professional[0]['updated_at']
-            }
+            professional_data = get_identity('professional', current_user, load_professional)
+            if not professional_data:
+                return {'message': 'Profissional não encontrado'}, 404
 
             return professional_data, 200
 
@@ -0,0 +1,70 @@
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respostas menores que este tamanho (em bytes) são enviadas sem compressão
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_LEVEL = int(os.getenv('COMPRESSION_BROTLI_LEVEL', '4'))
+
+# Níveis usados em corpos comprimidos uma única vez (ex: catálogo de alimentos)
+MAX_COMPRESSION_LEVELS = {'gzip': 9, 'br': 11}
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+# Ordem de preferência quando o cliente aceita as duas com a mesma qualidade
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_LEVEL if level is None else level)
+    # mtime fixo: o mesmo conteúdo gera sempre os mesmos bytes
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def negotiate_encoding(size):
+    """
+    Codificação a usar para um corpo de size bytes, conforme o Accept-Encoding da requisição
+
+    Returns:
+        str: 'br' ou 'gzip', ou None para enviar sem compressão
+    """
+    if size < COMPRESSION_MIN_SIZE:
+        return None
+    return request.accept_encodings.best_match(SUPPORTED_ENCODINGS)
+
+
+def compress_response(response):
+    """
+    Comprime respostas JSON/CSV (after_request)
+
+    Respostas transmitidas em partes (stream) e respostas que já definem
+    Content-Encoding (ex: corpos pré-comprimidos do FoodList) são mantidas.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if 'Content-Encoding' in response.headers:
+        return response
+
+    data = response.get_data()
+    encoding = negotiate_encoding(len(data))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # O mesmo conteúdo tem mais de uma representação em bytes: o ETag deixa de ser forte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -1,11 +1,20 @@
 import pymysql
 from dotenv import load_dotenv
+import logging
 import os
+import queue
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
 from contextlib import contextmanager
-from decimal import Decimal
+from flask import g, has_app_context
+from app.utils.metrics import record_query, record_acquire, query_fingerprint
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def get_db_config():
     return {
@@ -17,27 +26,197 @@ def get_db_config():
     }
 
 
-def connect_database():
-    config = get_db_config()
-    try:
-        connection = pymysql.connect(**config)
-        print("Conexão estabelecida com MySQL.")
+def get_pool_config():
+    return {
+        "size": int(os.getenv("MYSQL_POOL_SIZE", "10")),
+        "timeout": float(os.getenv("MYSQL_POOL_TIMEOUT", "10")),
+        "recycle": float(os.getenv("MYSQL_POOL_RECYCLE", "3600"))
+    }
+
+
+# Threads que executam as queries de execute_many_concurrently; 0 executa tudo em sequência
+CONCURRENT_QUERY_WORKERS = int(os.getenv("MYSQL_CONCURRENT_QUERY_WORKERS", "4"))
+
+
+class PoolExhaustedError(Exception):
+    """Nenhuma conexão ficou disponível no pool dentro do tempo limite."""
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões MySQL reutilizáveis
+
+    Args:
+        size (int): Número máximo de conexões abertas ao mesmo tempo
+        timeout (float): Segundos de espera por uma conexão livre antes de PoolExhaustedError
+        recycle (float): Idade máxima (em segundos) de uma conexão antes de ser descartada
+        **config: Parâmetros repassados para pymysql.connect
+    """
+
+    def __init__(self, size, timeout, recycle, **config):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._config = config
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection = pymysql.connect(**self._config)
+        connection._pool_created_at = time.monotonic()
         return connection
-    except pymysql.MySQLError as e:
-        print("Erro ao conectar ao MySQL", e)
-        return None
+
+    def _is_usable(self, connection):
+        if time.monotonic() - connection._pool_created_at > self.recycle:
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except pymysql.MySQLError:
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except pymysql.MySQLError:
+            pass
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhaustedError(
+                f"Nenhuma conexão disponível no pool após {self.timeout}s (tamanho: {self.size})"
+            )
+        return self._checkout()
+
+    def try_acquire(self):
+        """Como acquire, mas retorna None na hora (sem esperar) se todas as conexões estiverem em uso"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        return self._checkout()
+
+    def _checkout(self):
+        # Chamado com um slot já reservado; em caso de erro o slot é devolvido
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_usable(connection):
+                    return connection
+                self._discard(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard:
+                # Conexão em estado desconhecido (ex: resultado sem buffer lido pela metade)
+                self._discard(connection)
+            elif connection.open:
+                # Encerra qualquer transação/snapshot pendente antes de devolver ao pool
+                connection.rollback()
+                self._idle.put(connection)
+        except pymysql.MySQLError:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**get_pool_config(), **get_db_config())
+    return _pool
 
 
 @contextmanager
 def get_db_connection():
-    connection = None
+    # Dentro de uma requisição, todas as queries compartilham a mesma conexão do pool,
+    # devolvida em release_request_connection ao fim do contexto da aplicação
+    if has_app_context():
+        connection = g.get('_db_connection')
+        if connection is None:
+            started = time.perf_counter()
+            connection = g._db_connection = get_pool().acquire()
+            record_acquire(time.perf_counter() - started)
+        yield connection
+        return
+
+    pool = get_pool()
+    connection = pool.acquire()
     try:
-        connection = connect_database()
         yield connection
     finally:
-        if connection:
-            connection.close()
-            print("Conexão fechada.")
+        pool.release(connection)
+
+
+def release_request_connection(exception=None):
+    connection = g.pop('_db_connection', None)
+    if connection is not None:
+        get_pool().release(connection)
+
+
+def _run_query(connection, query, params=None, return_id=False, commit=True):
+    with connection.cursor() as cursor:
+        started = time.perf_counter()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            # Para consultas SELECT
+            if query.strip().upper().startswith("SELECT"):
+                rows = cursor.fetchall()
+                record_query(query, time.perf_counter() - started, len(rows))
+                return rows
+
+            # Para outras operações
+            if commit:
+                connection.commit()
+            record_query(query, time.perf_counter() - started, cursor.rowcount)
+
+            if return_id:
+                # Retorna o último ID inserido (para INSERT)
+                return cursor.lastrowid
+            else:
+                # Retorna o número de linhas afetadas (para UPDATE/DELETE)
+                return cursor.rowcount
+
+        except pymysql.MySQLError as err:
+            record_query(query, time.perf_counter() - started)
+            # Apenas a query normalizada: os parâmetros podem conter hashes de senha, CPF e e-mail
+            logger.error(f"Erro ao executar query: {err} | {query_fingerprint(query)}")
+            if commit:
+                connection.rollback()
+            raise
+
+
+def _run_many(connection, query, params_seq, commit=True):
+    with connection.cursor() as cursor:
+        started = time.perf_counter()
+        try:
+            cursor.executemany(query, params_seq)
+            if commit:
+                connection.commit()
+            record_query(query, time.perf_counter() - started, cursor.rowcount)
+            return cursor.rowcount
+
+        except pymysql.MySQLError as err:
+            record_query(query, time.perf_counter() - started)
+            logger.error(f"Erro ao executar query: {err} | {query_fingerprint(query)} ({len(params_seq)} linhas)")
+            if commit:
+                connection.rollback()
+            raise
 
 
 def execute_query(query, params=None, return_id=False):
@@ -54,44 +233,265 @@ def execute_query(query, params=None, return_id=False):
         - Para INSERT/UPDATE/DELETE:
             - Se return_id=True: ID do último registro inserido
             - Se return_id=False: Número de linhas afetadas
+
+    Dentro de um bloco transaction(), a query participa da transação aberta
+    e não faz commit próprio.
     """
     with get_db_connection() as connection:
-        with connection.cursor() as cursor:
-            try:
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-
-                # Para consultas SELECT
-                if query.strip().upper().startswith("SELECT"):
-                    return cursor.fetchall()
-
-                # Para outras operações
-                connection.commit()
+        return _execute(connection, query, params, return_id)
 
-                if return_id:
-                    # Retorna o último ID inserido (para INSERT)
-                    return cursor.lastrowid
-                else:
-                    # Retorna o número de linhas afetadas (para UPDATE/DELETE)
-                    return cursor.rowcount
-
-            except pymysql.MySQLError as err:
-                print(f"Error: {err}")
-                print(f"Query: {query}")
-                print(f"Params: {params}")
-                connection.rollback()
-                raise
-
-# python can't serialize a decimal into JSON, so it needs to be converted to float
-
-def convert_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_decimal(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
+
+def _execute(connection, query, params=None, return_id=False):
+    in_transaction = getattr(connection, '_transaction', None) is not None
+    return _run_query(connection, query, params, return_id, commit=not in_transaction)
+
+
+def execute_many(query, params_seq):
+    """
+    Executa a mesma query para várias linhas de parâmetros
+
+    Para INSERT ... VALUES (%s, ...) o pymysql agrupa as linhas em INSERTs
+    multi-linha, então o número de round-trips não depende da quantidade de linhas.
+    Para isso o VALUES deve conter apenas placeholders (sem NOW() etc.).
+
+    Args:
+        query (str): Query SQL a ser executada
+        params_seq (list): Lista de tuplas de parâmetros, uma por linha
+
+    Returns:
+        Número de linhas afetadas
+    """
+    if not params_seq:
+        return 0
+    with get_db_connection() as connection:
+        in_transaction = getattr(connection, '_transaction', None) is not None
+        return _run_many(connection, query, params_seq, commit=not in_transaction)
+
+
+_query_executor = None
+_query_executor_lock = threading.Lock()
+# Threads livres do executor: uma query só é enviada se houver uma, então nada fica na fila
+# do executor (que é compartilhado por todas as requisições do processo)
+_query_worker_slots = threading.BoundedSemaphore(max(CONCURRENT_QUERY_WORKERS, 1))
+
+
+def _get_query_executor():
+    global _query_executor
+    if CONCURRENT_QUERY_WORKERS <= 0:
+        return None
+    if _query_executor is None:
+        with _query_executor_lock:
+            if _query_executor is None:
+                _query_executor = ThreadPoolExecutor(max_workers=CONCURRENT_QUERY_WORKERS, thread_name_prefix='db-query')
+    return _query_executor
+
+
+def _run_pooled_query(pool, connection, query, params):
+    try:
+        return _run_query(connection, query, params)
+    finally:
+        pool.release(connection)
+        _query_worker_slots.release()
+
+
+def _reserve_query_worker(pool):
+    """
+    Reserva, sem esperar, uma thread do executor e uma conexão própria do pool
+
+    Quem chama já segura a conexão da requisição; esperar por uma segunda
+    conexão nesse estado esgota o pool quando todas as requisições em andamento
+    fazem o mesmo. Sem thread ou conexão livre, a query roda em sequência.
+
+    Returns:
+        Conexão reservada ou None
+    """
+    if not _query_worker_slots.acquire(blocking=False):
+        return None
+    try:
+        connection = pool.try_acquire()
+    except Exception:
+        _query_worker_slots.release()
+        raise
+    if connection is None:
+        _query_worker_slots.release()
+    return connection
+
+
+def execute_many_concurrently(queries):
+    """
+    Executa queries independentes ao mesmo tempo, cada uma em uma conexão
+
+    A primeira roda na thread atual (com a conexão da requisição) e as demais
+    em threads do executor, com conexões próprias do pool; a latência passa a
+    ser a da query mais lenta e não a soma de todas. As queries não enxergam
+    umas às outras nem uma transaction() aberta, então use apenas para leituras
+    que não dependam de escritas ainda não confirmadas.
+
+    Threads e conexões extras são usadas apenas se estiverem livres no momento:
+    com o pool ou o executor ocupados, as queries restantes rodam em sequência
+    na conexão da requisição, como em execute_query.
+
+    Args:
+        queries (list): Lista de tuplas (query, params)
+
+    Returns:
+        list: Resultado de execute_query para cada query, na mesma ordem
+    """
+    queries = list(queries)
+    executor = _get_query_executor()
+    if executor is None or len(queries) < 2:
+        return [execute_query(query, params) for query, params in queries]
+
+    pool = get_pool()
+    results = [None] * len(queries)
+    futures = {}
+    # A conexão da requisição é obtida antes das extras (que nunca esperam)
+    with get_db_connection() as connection:
+        try:
+            for index, (query, params) in enumerate(queries[1:], start=1):
+                worker_connection = _reserve_query_worker(pool)
+                if worker_connection is None:
+                    break
+                # Cada thread roda em uma cópia do contexto, para as métricas contarem na requisição atual
+                futures[index] = executor.submit(
+                    contextvars.copy_context().run, _run_pooled_query, pool, worker_connection, query, params
+                )
+            for index, (query, params) in enumerate(queries):
+                if index not in futures:
+                    results[index] = _execute(connection, query, params)
+        finally:
+            # Mesmo com erro, espera as demais para não deixar queries rodando após a resposta
+            wait(futures.values())
+    for index, future in futures.items():
+        results[index] = future.result()
+    return results
+
+
+def stream_query(query, params=None, batch_size=500):
+    """
+    Executa um SELECT com cursor sem buffer (SSDictCursor) e retorna um iterador das linhas
+
+    As linhas são lidas do servidor em lotes de batch_size conforme o iterador é
+    consumido, então a memória não depende do tamanho do resultado. A query roda
+    em uma conexão própria do pool (não a da requisição), já que o iterador é
+    consumido depois que a view retorna. Erros ao executar a query são lançados
+    aqui, antes do primeiro byte da resposta.
+
+    A conexão é devolvida quando o iterador termina ou quando close() é chamado.
+    Quem monta a resposta deve registrar close() com response.call_on_close: o
+    corpo pode nunca ser lido (HEAD, cliente desconectado antes do primeiro
+    pedaço), e nesse caso só o fechamento da resposta libera a conexão.
+
+    Args:
+        query (str): Query SELECT
+        params (tuple|dict, optional): Parâmetros para a query
+        batch_size (int, optional): Linhas lidas do socket por vez
+
+    Returns:
+        UnbufferedRows: iterador de dicionários, um por linha
+    """
+    pool = get_pool()
+    started = time.perf_counter()
+    connection = pool.acquire()
+    record_acquire(time.perf_counter() - started)
+    try:
+        cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        # Mede só até o início do resultado; as linhas são lidas depois, durante a resposta
+        record_query(query, time.perf_counter() - started)
+    except Exception:
+        pool.release(connection, discard=True)
+        raise
+    return UnbufferedRows(pool, connection, cursor, batch_size)
+
+
+class UnbufferedRows:
+    """Linhas de stream_query; devolve a conexão ao pool ao terminar ou em close(), mesmo sem ter sido lido"""
+
+    def __init__(self, pool, connection, cursor, batch_size):
+        self._pool = pool
+        self._connection = connection
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._rows = self._iterate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def _iterate(self):
+        try:
+            while True:
+                rows = self._cursor.fetchmany(self._batch_size)
+                if not rows:
+                    break
+                yield from rows
+            self._cursor.close()
+        except BaseException:
+            self._release(discard=True)
+            raise
+        self._release(discard=False)
+
+    def _release(self, discard):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, discard=discard)
+
+    def close(self):
+        """Interrompe a leitura e devolve a conexão (pode ser chamado mais de uma vez)"""
+        self._rows.close()
+        # Se o consumidor parou antes do fim, o restante do resultado ainda está no
+        # socket; fechar a conexão é mais barato que ler e descartar todas as linhas
+        self._release(discard=True)
+
+
+class Transaction:
+    """Unidade de trabalho que executa várias queries na mesma conexão com um único commit"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None, return_id=False):
+        """Mesma semântica de execute_query, sem commit intermediário"""
+        return _run_query(self.connection, query, params, return_id, commit=False)
+
+    def execute_many(self, query, params_seq):
+        """Mesma semântica de execute_many, sem commit intermediário"""
+        if not params_seq:
+            return 0
+        return _run_many(self.connection, query, params_seq, commit=False)
+
+
+@contextmanager
+def transaction():
+    """
+    Abre uma transação na conexão da requisição
+
+    Uso:
+        with transaction() as tx:
+            tx.execute(...)
+            tx.execute(...)
+
+    Faz commit ao sair do bloco e rollback se alguma exceção for lançada.
+    Blocos aninhados participam da transação mais externa.
+    """
+    with get_db_connection() as connection:
+        current = getattr(connection, '_transaction', None)
+        if current is not None:
+            yield current
+            return
+
+        tx = Transaction(connection)
+        connection._transaction = tx
+        try:
+            connection.begin()
+            yield tx
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection._transaction = None
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from app.utils.db import execute_query
+from app.utils.compression import compress, MAX_COMPRESSION_LEVELS
+from app.utils.serialization import dumpb
+
+
+def normalize_food_name(name):
+    """
+    Chave de busca por nome de alimento
+
+    Aproxima a collation utf8mb4_unicode_ci de tb_foods.name, que ignora
+    maiúsculas/minúsculas, acentos e espaços finais.
+    """
+    decomposed = unicodedata.normalize('NFKD', name.rstrip())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def format_food(row):
+    default_portion = {
+        "grams": row['default_portion_grams'],
+        "energy_value_kcal": row['energy_value_kcal'],
+        "portion": row['portion'],
+        "unit_measure": row['unit_measure']
+    }
+    return {
+        "id": row['id'],
+        "name": row['name'],
+        "food_group": row['food_group_name'],
+        "default_portion": default_portion
+    }
+
+
+class FoodCatalogSnapshot:
+    """
+    Cópia imutável de tb_foods carregada em memória
+
+    Attributes:
+        payload (list): Lista de alimentos já no formato de resposta do FoodList
+        body (bytes): payload serializado em JSON, calculado uma vez por versão
+        by_name (dict): normalize_food_name(name) -> id
+        by_id (dict): id -> linha de tb_foods
+        version (str): Hash do conteúdo; igual em todos os processos para o mesmo catálogo (usado como ETag)
+    """
+
+    def __init__(self, rows):
+        self.payload = [format_food(row) for row in rows]
+        self.body = dumpb(self.payload) + b"\n"
+        self.by_name = {normalize_food_name(row['name']): row['id'] for row in rows}
+        self.by_id = {row['id']: row for row in rows}
+        self.version = hashlib.sha256(self.body).hexdigest()[:32]
+        self.loaded_at = time.monotonic()
+        self._encoded_bodies = {}
+
+    def encoded_body(self, encoding):
+        """body comprimido em encoding ('gzip' ou 'br'), calculado no nível máximo uma vez por versão"""
+        body = self._encoded_bodies.get(encoding)
+        if body is None:
+            body = self._encoded_bodies[encoding] = compress(self.body, encoding, MAX_COMPRESSION_LEVELS[encoding])
+        return body
+
+
+class FoodCatalog:
+    """
+    Cache em processo do catálogo de alimentos (tb_foods)
+
+    O catálogo muda raramente (é populado por insert_initial_data), então é
+    recarregado apenas quando expira o TTL, quando invalidate() é chamado ou
+    quando um nome desconhecido é pedido e a cópia atual tem mais de
+    miss_reload_interval segundos.
+
+    Args:
+        ttl (float): Segundos até a cópia em memória ser recarregada
+        miss_reload_interval (float): Intervalo mínimo entre recargas causadas por nomes desconhecidos
+    """
+
+    def __init__(self, ttl, miss_reload_interval=5.0):
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        query = """
+            SELECT
+                id,
+                name,
+                food_group_name,
+                default_portion_grams,
+                energy_value_kcal,
+                portion,
+                unit_measure
+            FROM tb_foods
+            ORDER BY id ASC
+        """
+        self._snapshot = FoodCatalogSnapshot(execute_query(query))
+        return self._snapshot
+
+    def _expired(self, snapshot, max_age):
+        return snapshot is None or time.monotonic() - snapshot.loaded_at > max_age
+
+    def get(self):
+        snapshot = self._snapshot
+        if not self._expired(snapshot, self.ttl):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._expired(snapshot, self.ttl):
+                snapshot = self._load()
+            return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def resolve_ids(self, names):
+        """
+        Resolve nomes de alimentos para IDs usando apenas a memória
+
+        Args:
+            names (iterable): Nomes de alimentos
+
+        Returns:
+            tuple: (dict nome -> id dos encontrados, lista de nomes não encontrados)
+        """
+        snapshot = self.get()
+        ids, missing = self._lookup(snapshot, names)
+        if missing and self._expired(snapshot, self.miss_reload_interval):
+            with self._lock:
+                if self._snapshot is snapshot:
+                    self._load()
+            ids, missing = self._lookup(self.get(), names)
+        return ids, missing
+
+    @staticmethod
+    def _lookup(snapshot, names):
+        ids = {}
+        missing = []
+        for name in names:
+            food_id = snapshot.by_name.get(normalize_food_name(name)) if isinstance(name, str) else None
+            if food_id is not None:
+                ids[name] = food_id
+            elif name not in missing:
+                missing.append(name)
+        return ids, missing
+
+
+food_catalog = FoodCatalog(ttl=float(os.getenv("FOOD_CATALOG_TTL", "300")))
@@ -0,0 +1,29 @@
+import os
+from app.utils.cache import TTLCache
+
+# Versão do formato dos claims do JWT. Os tokens carregam apenas id (sub), role e esta versão;
+# dados de perfil são lidos do banco e mantidos no cache abaixo.
+JWT_CLAIMS_VERSION = 2
+
+identity_cache = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', '60'))
+)
+
+
+def token_claims(role):
+    return {'role': role, 'ver': JWT_CLAIMS_VERSION}
+
+
+def get_identity(role, user_id, loader):
+    """
+    Retorna os dados de perfil de (role, user_id), carregando com loader() em caso de falta
+
+    Cada processo tem seu próprio cache; uma alteração feita em outro processo
+    é vista aqui em no máximo IDENTITY_CACHE_TTL segundos.
+    """
+    return identity_cache.get_or_load((role, int(user_id)), loader)
+
+
+def invalidate_identity(role, user_id):
+    identity_cache.delete((role, int(user_id)))
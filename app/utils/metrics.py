@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request
+
+# Queries mais lentas que este limite (em ms) vão para o log app.slow_query
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+
+request_logger = logging.getLogger('app.requests')
+slow_query_logger = logging.getLogger('app.slow_query')
+
+# As queries de execute_many_concurrently são contabilizadas a partir de outras threads
+_stats_lock = threading.Lock()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+
+
+def query_fingerprint(query):
+    """
+    Forma normalizada de uma query, igual para todas as execuções com parâmetros diferentes
+
+    Ex: "SELECT id FROM tb_patients WHERE id = %s" -> "SELECT id FROM tb_patients WHERE id = ?"
+    """
+    fingerprint = _PLACEHOLDER_RE.sub('?', _WHITESPACE_RE.sub(' ', query).strip())
+    return _IN_LIST_RE.sub('IN (?)', fingerprint)
+
+
+def _request_stats():
+    if not has_app_context():
+        return None
+    stats = g.get('_request_stats')
+    if stats is None:
+        with _stats_lock:
+            stats = g.get('_request_stats')
+            if stats is None:
+                stats = g._request_stats = {'queries': 0, 'db_time': 0.0, 'acquire_time': 0.0}
+    return stats
+
+
+def record_query(query, elapsed, rows=None):
+    """Contabiliza uma query na requisição atual e registra no log de queries lentas se passar do limite"""
+    stats = _request_stats()
+    if stats is not None:
+        with _stats_lock:
+            stats['queries'] += 1
+            stats['db_time'] += elapsed
+
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+        slow_query_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'duration_ms': round(elapsed_ms, 2),
+            'fingerprint': query_fingerprint(query),
+            'rows': rows,
+            'path': request.path if has_request_context() else None
+        }))
+
+
+def record_acquire(elapsed):
+    """Contabiliza o tempo de espera por uma conexão do pool"""
+    stats = _request_stats()
+    if stats is not None:
+        with _stats_lock:
+            stats['acquire_time'] += elapsed
+
+
+def start_request_timer():
+    g._request_started = time.perf_counter()
+
+
+def add_request_timing(response):
+    """
+    Adiciona o header Server-Timing e registra um log estruturado da requisição
+
+    Para respostas transmitidas (stream), apenas o tempo até o início do corpo é medido.
+    """
+    started = g.pop('_request_started', None)
+    if started is None:
+        return response
+    total_ms = (time.perf_counter() - started) * 1000
+    stats = g.get('_request_stats') or {'queries': 0, 'db_time': 0.0, 'acquire_time': 0.0}
+    db_ms = stats['db_time'] * 1000
+    acquire_ms = stats['acquire_time'] * 1000
+
+    response.headers['Server-Timing'] = (
+        f'app;dur={total_ms:.2f}, '
+        f'db;dur={db_ms:.2f};desc="{stats["queries"]} queries", '
+        f'pool;dur={acquire_ms:.2f}'
+    )
+    request_logger.info(json.dumps({
+        'event': 'request',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'queries': stats['queries'],
+        'db_ms': round(db_ms, 2),
+        'pool_acquire_ms': round(acquire_ms, 2)
+    }))
+    return response
@@ -0,0 +1,86 @@
+import os
+from decimal import Decimal
+from app.utils.cache import TTLCache
+from app.utils.db import execute_query
+
+# Totais calóricos por (plano, versão, janela). A versão muda a cada escrita no plano,
+# então uma entrada nunca fica desatualizada; o TTL apenas libera memória.
+summary_cache = TTLCache(
+    maxsize=int(os.getenv('MEAL_PLAN_SUMMARY_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('MEAL_PLAN_SUMMARY_CACHE_TTL', '600'))
+)
+
+
+def _kcal(value):
+    return round(float(value), 2)
+
+
+def load_meal_plan_totals(meal_plan_id, window=(None, None)):
+    """
+    Soma as calorias do plano no banco, por refeição
+
+    A energia de cada alimento é energy_value_kcal (porção padrão de tb_foods)
+    multiplicada pela quantidade prescrita. Os totais por dia e do plano são
+    somas das poucas linhas por refeição retornadas pelo GROUP BY.
+
+    Args:
+        meal_plan_id (int): ID do plano alimentar
+        window (tuple): (from, to) em 'YYYY-MM-DD', inclusivos; None não limita
+
+    Returns:
+        dict: {'total_kcal', 'days': [{'day_of_plan', 'total_kcal', 'meals': [...]}]}
+    """
+    conditions = []
+    params = [meal_plan_id]
+    if window[0]:
+        conditions.append("AND mpe.day_of_plan >= %s")
+        params.append(window[0])
+    if window[1]:
+        conditions.append("AND mpe.day_of_plan <= %s")
+        params.append(window[1])
+
+    totals_query = f"""
+        SELECT
+            mpe.id AS entry_id,
+            mpe.meal_type_name,
+            DATE_FORMAT(mpe.day_of_plan, '%%Y-%%m-%%d') AS day_of_plan,
+            TIME_FORMAT(mpe.time_scheduled, '%%H:%%i') AS time_scheduled,
+            COALESCE(SUM(f.energy_value_kcal * mpf.prescribed_portion), 0) AS total_kcal
+        FROM tb_meal_plan_entries mpe
+        LEFT JOIN tb_meal_plan_foods mpf ON mpf.meal_plan_entry_id = mpe.id
+        LEFT JOIN tb_foods f ON mpf.food_id = f.id
+        WHERE mpe.meal_plan_id = %s
+        {' '.join(conditions)}
+        GROUP BY mpe.day_of_plan, mpe.meal_type_name, mpe.id
+        ORDER BY mpe.day_of_plan, mpe.time_scheduled, mpe.id
+    """
+    rows = execute_query(totals_query, tuple(params))
+
+    days = []
+    day_totals = {}
+    plan_total = Decimal(0)
+    for row in rows:
+        day = day_totals.get(row['day_of_plan'])
+        if day is None:
+            day = day_totals[row['day_of_plan']] = {'day_of_plan': row['day_of_plan'], 'total_kcal': Decimal(0), 'meals': []}
+            days.append(day)
+        day['total_kcal'] += row['total_kcal']
+        plan_total += row['total_kcal']
+        day['meals'].append({
+            'entry_id': row['entry_id'],
+            'meal_type_name': row['meal_type_name'],
+            'time_scheduled': row['time_scheduled'],
+            'total_kcal': _kcal(row['total_kcal'])
+        })
+
+    for day in days:
+        day['total_kcal'] = _kcal(day['total_kcal'])
+    return {'total_kcal': _kcal(plan_total), 'days': days}
+
+
+def get_meal_plan_totals(meal_plan_id, version, window=(None, None)):
+    """Totais do plano na versão informada, calculados no banco apenas na primeira leitura"""
+    return summary_cache.get_or_load(
+        (meal_plan_id, version, window),
+        lambda: load_meal_plan_totals(meal_plan_id, window)
+    )
@@ -0,0 +1,135 @@
+import os
+import threading
+from itertools import repeat
+from concurrent.futures import Future, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Algoritmo e custo usados para novos hashes (formato do werkzeug, ex: 'pbkdf2:sha256:600000' ou 'scrypt')
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:100000')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '8'))
+# Processos dedicados ao hashing; 0 executa no próprio processo da requisição
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+# Processos separados para hashes em lote (importação), para não enfileirar os logins atrás deles
+PASSWORD_BULK_HASH_WORKERS = int(os.getenv('PASSWORD_BULK_HASH_WORKERS', '2'))
+
+_executor = None
+_bulk_executor = None
+_executor_lock = threading.Lock()
+_current_method = None
+
+
+def _get_executor():
+    global _executor
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _executor
+
+
+def _get_bulk_executor():
+    global _bulk_executor
+    if PASSWORD_BULK_HASH_WORKERS <= 0:
+        return None
+    if _bulk_executor is None:
+        with _executor_lock:
+            if _bulk_executor is None:
+                _bulk_executor = ProcessPoolExecutor(max_workers=PASSWORD_BULK_HASH_WORKERS)
+    return _bulk_executor
+
+
+def _run(fn, *args):
+    """
+    Executa fn em um processo do pool
+
+    O PBKDF2 segura a GIL durante dezenas de milissegundos; fora do processo
+    do servidor, a thread da requisição apenas espera o resultado e as demais
+    requisições continuam sendo atendidas.
+    """
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH)
+
+
+def submit_password_hash(password):
+    """
+    Inicia o hash da senha sem esperar o resultado
+
+    A requisição pode consultar o banco enquanto o hash é calculado em outro processo.
+
+    Returns:
+        Future: resultado de hash_password(password)
+    """
+    executor = _get_executor()
+    if executor is None:
+        future = Future()
+        future.set_result(generate_password_hash(password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH))
+        return future
+    return executor.submit(generate_password_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH)
+
+
+def hash_passwords(passwords):
+    """
+    Gera os hashes de várias senhas, distribuídos entre os processos de hashing em lote
+
+    Os processos são separados dos usados por hash_password/verify_password:
+    o executor atende em ordem de chegada, e um lote grande no mesmo pool
+    atrasaria todos os logins até terminar.
+
+    Returns:
+        list: Hashes na mesma ordem de passwords
+    """
+    passwords = list(passwords)
+    executor = _get_bulk_executor()
+    if executor is None:
+        return [generate_password_hash(password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH) for password in passwords]
+    chunksize = max(1, len(passwords) // (PASSWORD_BULK_HASH_WORKERS * 4))
+    return list(executor.map(
+        generate_password_hash, passwords,
+        repeat(PASSWORD_HASH_METHOD), repeat(PASSWORD_SALT_LENGTH),
+        chunksize=chunksize
+    ))
+
+
+def verify_password(stored_hash, password):
+    return _run(check_password_hash, stored_hash, password)
+
+
+def _configured_method():
+    # O werkzeug grava o método normalizado (ex: 'scrypt' vira 'scrypt:32768:8:1'),
+    # então a referência é obtida do próprio formato gerado. Esse hash tem o custo
+    # configurado: é calculado uma vez por processo, fora da thread da requisição
+    global _current_method
+    if _current_method is None:
+        _current_method = _run(generate_password_hash, '', PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH).split('$', 1)[0]
+    return _current_method
+
+
+def needs_rehash(stored_hash):
+    """Indica se o hash foi gerado com algoritmo, custo ou salt diferentes dos configurados"""
+    try:
+        method, salt, _ = stored_hash.split('$', 2)
+    except ValueError:
+        return True
+    return method != _configured_method() or len(salt) != PASSWORD_SALT_LENGTH
+
+
+def verify_and_update(stored_hash, password):
+    """
+    Verifica a senha e, se o hash armazenado estiver desatualizado, gera um novo
+
+    Returns:
+        tuple: (senha válida, novo hash a ser gravado ou None)
+    """
+    if not verify_password(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash):
+        return True, hash_password(password)
+    return True, None
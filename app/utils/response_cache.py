@@ -0,0 +1,165 @@
+import logging
+import os
+from app.utils.cache import TTLCache
+from app.utils.serialization import dumpb, loads
+
+logger = logging.getLogger(__name__)
+
+# Backend do cache de respostas do GetMealPlan: 'local' (memória de cada processo),
+# 'redis' (compartilhado entre os workers do gunicorn) ou 'none' (desligado)
+MEAL_PLAN_CACHE_BACKEND = os.getenv('MEAL_PLAN_CACHE_BACKEND', 'local')
+MEAL_PLAN_CACHE_SIZE = int(os.getenv('MEAL_PLAN_CACHE_SIZE', '1024'))
+MEAL_PLAN_CACHE_TTL = float(os.getenv('MEAL_PLAN_CACHE_TTL', '300'))
+# Janelas (from/to/day) guardadas por paciente; as mais antigas são descartadas
+MEAL_PLAN_CACHE_MAX_WINDOWS = int(os.getenv('MEAL_PLAN_CACHE_MAX_WINDOWS', '16'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+
+class LocalCacheBackend:
+    """
+    Backend em memória do processo (LRU com TTL)
+
+    Cada chave guarda um dicionário de campos; sem dependências externas,
+    também serve de backend falso em testes.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key, field):
+        fields = self._cache.get(key)
+        return fields.get(field) if fields else None
+
+    def set(self, key, field, value, prefix, max_fields):
+        # Novo dicionário (não altera o que outra thread possa estar lendo) apenas com os
+        # campos que começam com prefix, limitado a max_fields (os mais antigos saem)
+        fields = {
+            name: cached for name, cached in (self._cache.get(key) or {}).items()
+            if name.startswith(prefix) and name != field
+        }
+        while len(fields) >= max_fields:
+            fields.pop(next(iter(fields)))
+        fields[field] = value
+        self._cache.set(key, fields)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+
+class RedisCacheBackend:
+    """
+    Backend compartilhado no Redis: cada chave é um hash (HGET/HSET) e expira como um todo
+
+    Requer o pacote redis (pip install redis).
+    """
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("MEAL_PLAN_CACHE_BACKEND=redis requer o pacote 'redis' instalado") from e
+        self._client = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    def get(self, key, field):
+        value = self._client.hget(key, field)
+        return loads(value) if value is not None else None
+
+    def set(self, key, field, value, prefix, max_fields):
+        names = [name.decode('utf-8') for name in self._client.hkeys(key)]
+        current = [name for name in names if name.startswith(prefix) and name != field]
+        stale = [name for name in names if not name.startswith(prefix)]
+        stale += current[:max(0, len(current) - max_fields + 1)]
+
+        pipeline = self._client.pipeline()
+        if stale:
+            pipeline.hdel(key, *stale)
+        pipeline.hset(key, field, dumpb(value))
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+class NullCacheBackend:
+    """Cache desligado: toda leitura é uma falta"""
+
+    def get(self, key, field):
+        return None
+
+    def set(self, key, field, value, prefix, max_fields):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def create_backend(name=MEAL_PLAN_CACHE_BACKEND):
+    if name == 'local':
+        return LocalCacheBackend(MEAL_PLAN_CACHE_SIZE, MEAL_PLAN_CACHE_TTL)
+    if name == 'redis':
+        return RedisCacheBackend(REDIS_URL, MEAL_PLAN_CACHE_TTL)
+    if name == 'none':
+        return NullCacheBackend()
+    raise RuntimeError(f"MEAL_PLAN_CACHE_BACKEND inválido: '{name}' (use local, redis ou none)")
+
+
+class MealPlanResponseCache:
+    """
+    Respostas do GetMealPlan por paciente
+
+    Cada paciente ocupa uma chave; dentro dela, cada resposta é um campo
+    identificado por (plano, versão, janela). Como a versão do plano muda a
+    cada escrita, uma resposta desatualizada nunca é servida, mesmo que uma
+    leitura concorrente grave depois da invalidação. A invalidação apenas
+    libera de uma vez todas as janelas do paciente.
+
+    Ao gravar, os campos de outras versões do plano são removidos e no máximo
+    max_windows janelas são mantidas por paciente, então a memória de cada
+    chave é limitada mesmo quando a escrita acontece em outro processo.
+
+    Falhas do backend não interrompem a requisição: são registradas e
+    tratadas como falta de cache.
+    """
+
+    def __init__(self, backend, max_windows=MEAL_PLAN_CACHE_MAX_WINDOWS):
+        self.backend = backend
+        self.max_windows = max_windows
+
+    @staticmethod
+    def _key(patient_id):
+        return f'meal_plan:{int(patient_id)}'
+
+    @staticmethod
+    def _version_prefix(meal_plan_id, version):
+        return f'{meal_plan_id}:{version}:'
+
+    @classmethod
+    def _field(cls, meal_plan_id, version, window):
+        return f"{cls._version_prefix(meal_plan_id, version)}{window[0] or ''}:{window[1] or ''}"
+
+    def get(self, patient_id, meal_plan_id, version, window):
+        try:
+            return self.backend.get(self._key(patient_id), self._field(meal_plan_id, version, window))
+        except Exception as e:
+            logger.warning(f"Falha ao ler o cache de planos alimentares: {str(e)}")
+            return None
+
+    def set(self, patient_id, meal_plan_id, version, window, value):
+        try:
+            self.backend.set(
+                self._key(patient_id), self._field(meal_plan_id, version, window), value,
+                self._version_prefix(meal_plan_id, version), self.max_windows
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao gravar o cache de planos alimentares: {str(e)}")
+
+    def invalidate(self, patient_id):
+        try:
+            self.backend.delete(self._key(patient_id))
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar o cache de planos alimentares: {str(e)}")
+
+
+meal_plan_cache = MealPlanResponseCache(create_backend())
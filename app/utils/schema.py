@@ -97,6 +97,7 @@ def create_tables(cnxn):
             start_date DATE NOT NULL,
             end_date DATE,
             goals TEXT,
+            version INT NOT NULL DEFAULT 1,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             FOREIGN KEY (patient_id) REFERENCES tb_patients(id) ON DELETE CASCADE,
@@ -131,7 +132,17 @@ def create_tables(cnxn):
             FOREIGN KEY (meal_plan_entry_id) REFERENCES tb_meal_plan_entries(id) ON DELETE CASCADE,
             FOREIGN KEY (food_id) REFERENCES tb_foods(id) ON DELETE RESTRICT
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-        """
+        """,
+
+        # Colunas adicionadas depois da criação das tabelas, para bancos já existentes
+        "ALTER TABLE tb_patient_meal_plans ADD COLUMN version INT NOT NULL DEFAULT 1 AFTER goals;",
+
+        # Índices criados à parte para também valerem em bancos já existentes
+        # (CREATE TABLE IF NOT EXISTS não altera tabelas criadas antes)
+        "CREATE INDEX idx_patient_professional_name ON tb_patients (professional_id, full_name);",
+        "CREATE INDEX idx_professional_phone ON tb_professionals (phone);",
+        "CREATE INDEX idx_patient_phone ON tb_patients (phone);",
+        "CREATE INDEX idx_meal_entry_plan_day_time ON tb_meal_plan_entries (meal_plan_id, day_of_plan, time_scheduled);"
     ]
 
     try:
@@ -145,6 +156,12 @@ def create_tables(cnxn):
                 if e.args[0] == 1051 and "DROP TABLE IF EXISTS" in command.upper():
                     print(
                         f"  Info: Tabela para DROP '{command.strip()[:50]}...' não existia ou já removida.")
+                elif e.args[0] == 1060 and command.upper().startswith("ALTER TABLE"):
+                    print(
+                        f"  Info: Coluna de '{command.split()[2]}' já existe.")
+                elif e.args[0] == 1061 and command.upper().startswith("CREATE INDEX"):
+                    print(
+                        f"  Info: Índice '{command.split()[2]}' já existe.")
                 else:
                     print(
                         f"  Erro ao executar comando: {command.strip()[:100]}... \n  ERRO: {e}")
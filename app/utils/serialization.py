@@ -0,0 +1,70 @@
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import current_app, make_response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Mesmo formato que a API já usava para created_at/updated_at
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _default(obj):
+    """Converte os tipos retornados pelo PyMySQL que não existem em JSON"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, datetime):
+        return obj.strftime(DATETIME_FORMAT)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        # Colunas TIME chegam como timedelta
+        seconds = int(obj.total_seconds())
+        return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    # Datas passam por _default para manter o formato acima em vez do ISO 8601 do orjson
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumpb(obj):
+        """Serializa obj em JSON (bytes UTF-8), sem copiar listas e dicionários"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumpb(obj):
+        """Serializa obj em JSON (bytes UTF-8), sem copiar listas e dicionários"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    loads = json.loads
+
+
+def dumps(obj):
+    return dumpb(obj).decode('utf-8')
+
+
+class FastJSONProvider(JSONProvider):
+    """Provider de JSON do Flask (jsonify, request.get_json) baseado em dumpb/loads"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return current_app.response_class(dumpb(obj) + b'\n', mimetype='application/json')
+
+
+def output_json(data, code, headers=None):
+    """Representação application/json do Flask-RESTful (substitui a padrão, baseada no json da stdlib)"""
+    response = make_response(dumpb(data) + b'\n', code)
+    response.headers.extend(headers or {})
+    return response
@@ -0,0 +1,65 @@
+import csv
+import io
+from app.utils.serialization import dumps
+
+# Tamanho aproximado (em bytes) de cada pedaço entregue ao servidor WSGI
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _chunked(parts, chunk_size):
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_json_array(items, key=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Gera um documento JSON com uma lista, serializando um item de cada vez
+
+    Com key, o documento é {"<key>": [...]}; sem key, apenas a lista. Nunca mantém
+    mais que chunk_size bytes de saída em memória.
+
+    Args:
+        items (iterable): Itens serializáveis com dumps (ex: gerador de stream_query)
+        key (str, optional): Chave do objeto que envolve a lista
+
+    Returns:
+        Gerador de bytes para Response(...)
+    """
+    def parts():
+        yield '{%s: [' % dumps(key) if key is not None else '['
+        for index, item in enumerate(items):
+            yield (',' if index else '') + dumps(item)
+        yield ']}\n' if key is not None else ']\n'
+
+    return _chunked(parts(), chunk_size)
+
+
+
+def stream_ndjson(items, chunk_size=STREAM_CHUNK_SIZE):
+    """Gera um item JSON por linha (application/x-ndjson)"""
+    return _chunked((dumps(item) + '\n' for item in items), chunk_size)
+
+
+def stream_csv(items, fieldnames, chunk_size=STREAM_CHUNK_SIZE):
+    """Gera um CSV com cabeçalho a partir de dicionários, uma linha por item"""
+    def parts():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for item in items:
+            writer.writerow(item)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(parts(), chunk_size)
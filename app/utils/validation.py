@@ -0,0 +1,275 @@
+import re
+from datetime import date
+from typing import Annotated, List, Literal, Optional
+from pydantic import AfterValidator, BaseModel, BeforeValidator, ConfigDict, Field, StringConstraints, ValidationError, model_validator
+from pydantic_core import PydanticCustomError
+from app.utils.food_catalog import normalize_food_name
+
+# Padrões compilados uma única vez; os modelos abaixo usam os mesmos padrões no validador nativo do Pydantic
+EMAIL_PATTERN = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+ELEVEN_DIGITS_PATTERN = r'^[0-9]{11}$'
+TIME_PATTERN = r'^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$'
+DATE_PATTERN = r'^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+ELEVEN_DIGITS_RE = re.compile(ELEVEN_DIGITS_PATTERN)
+DATE_RE = re.compile(DATE_PATTERN)
+
+PASSWORD_RULES = [
+    (re.compile(r'.{8,}'), 'A senha deve ter pelo menos 8 caracteres'),
+    (re.compile(r'[A-Z]'), 'A senha deve conter pelo menos uma letra maiúscula'),
+    (re.compile(r'[a-z]'), 'A senha deve conter pelo menos uma letra minúscula'),
+    (re.compile(r'[0-9]'), 'A senha deve conter pelo menos um número'),
+    (re.compile(r'[!@#$%^&*(),.?":{}|<>]'), 'A senha deve conter pelo menos um caractere especial')
+]
+
+
+def validate_password(password):
+    for regex, message in PASSWORD_RULES:
+        if not regex.search(password):
+            return False, message
+    return True, 'Senha válida'
+
+
+def _check_password(password):
+    valid, message = validate_password(password)
+    if not valid:
+        raise PydanticCustomError('invalid', message)
+    return password
+
+
+# Campos de texto livre (ex: regional_council) também aceitam números, como antes da validação com Pydantic
+def _check_date_format(value):
+    # No modo lax o Pydantic também aceita números (timestamp Unix: 0 vira 1970-01-01) e data com horário
+    if isinstance(value, date) or (isinstance(value, str) and DATE_RE.match(value)):
+        return value
+    raise PydanticCustomError('date_parsing', 'Data deve estar no formato YYYY-MM-DD')
+
+
+def _reject_bool(error_type):
+    # No modo lax true/false são aceitos como 1/0
+    def check(value):
+        if isinstance(value, bool):
+            raise PydanticCustomError(error_type, 'Valor booleano não é um número')
+        return value
+    return BeforeValidator(check)
+
+
+NonEmptyStr = Annotated[str, Field(coerce_numbers_to_str=True), StringConstraints(strip_whitespace=True, min_length=1)]
+FullName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=3)]
+Email = Annotated[str, StringConstraints(pattern=EMAIL_PATTERN)]
+ElevenDigits = Annotated[str, StringConstraints(pattern=ELEVEN_DIGITS_PATTERN)]
+Password = Annotated[str, AfterValidator(_check_password)]
+TimeOfDay = Annotated[str, StringConstraints(strip_whitespace=True, pattern=TIME_PATTERN)]
+IsoDate = Annotated[date, BeforeValidator(_check_date_format)]
+Integer = Annotated[int, _reject_bool('int_type')]
+Number = Annotated[float, _reject_bool('float_type')]
+Weight = Annotated[Number, Field(gt=0, le=500)]
+Height = Annotated[Number, Field(gt=0, le=3)]
+Quantity = Annotated[Number, Field(gt=0)]
+
+
+class Payload(BaseModel):
+    """Base dos corpos de requisição; campos desconhecidos são ignorados"""
+    model_config = ConfigDict(extra='ignore')
+
+
+# Profissionais e pacientes
+
+class ProfessionalRegistrationData(Payload):
+    full_name: NonEmptyStr
+    email: Email
+    password: Password
+    cpf: ElevenDigits
+    phone: ElevenDigits
+    regional_council_type: NonEmptyStr
+    regional_council: NonEmptyStr
+
+
+class PatientRegistrationData(Payload):
+    full_name: FullName
+    birth_date: IsoDate
+    gender: Literal['M', 'F', 'O']
+    email: Email
+    password: Password
+    phone: ElevenDigits
+    cpf: ElevenDigits
+    weight: Weight
+    height: Height
+    note: Optional[str] = None
+
+
+class PatientUpdateData(Payload):
+    """Atualização parcial: apenas os campos enviados (model_fields_set) são gravados"""
+    full_name: FullName = None
+    birth_date: IsoDate = None
+    gender: Literal['M', 'F', 'O'] = None
+    email: Email = None
+    phone: ElevenDigits = None
+    cpf: ElevenDigits = None
+    weight: Weight = None
+    height: Height = None
+    note: Optional[str] = None
+
+
+# Planos alimentares (formato do payload da API)
+
+class MealPlanFoodData(Payload):
+    food_name: NonEmptyStr
+    prescribed_quantity: Quantity
+    unit_measure: NonEmptyStr
+    energy_value_kcal: Number
+    preparation_notes: Optional[str] = None
+
+
+class MealPlanEntryData(Payload):
+    meal_type_name: NonEmptyStr
+    day_of_plan: IsoDate
+    time_scheduled: TimeOfDay
+    notes: Optional[str] = None
+    foods: List[MealPlanFoodData] = Field(min_length=1)
+
+
+def _check_date_range(plan):
+    if plan.start_date and plan.end_date and plan.end_date < plan.start_date:
+        raise PydanticCustomError('invalid', 'end_date deve ser igual ou posterior a start_date')
+    return plan
+
+
+def _check_unique_entries(plan):
+    # Mesma chave de uq_meal_entry (meal_plan_entry_key): a collation ignora maiúsculas e acentos
+    if plan.entries:
+        keys = [(normalize_food_name(entry.meal_type_name), entry.day_of_plan) for entry in plan.entries]
+        if len(set(keys)) != len(keys):
+            raise PydanticCustomError('invalid', 'Há mais de uma entrada para a mesma refeição no mesmo dia')
+    return plan
+
+
+class MealPlanCreateData(Payload):
+    patient_id: Integer
+    plan_name: NonEmptyStr
+    start_date: IsoDate
+    end_date: IsoDate
+    goals: Optional[str] = None
+    entries: List[MealPlanEntryData] = Field(min_length=1)
+
+    date_range = model_validator(mode='after')(_check_date_range)
+    unique_entries = model_validator(mode='after')(_check_unique_entries)
+
+
+class MealPlanUpdateData(Payload):
+    plan_name: NonEmptyStr = None
+    start_date: IsoDate = None
+    end_date: IsoDate = None
+    goals: Optional[str] = None
+    entries: Optional[List[MealPlanEntryData]] = None
+
+    date_range = model_validator(mode='after')(_check_date_range)
+    unique_entries = model_validator(mode='after')(_check_unique_entries)
+
+
+class MealPlanEntryPatchData(Payload):
+    meal_type_name: NonEmptyStr = None
+    day_of_plan: IsoDate = None
+    time_scheduled: TimeOfDay = None
+    notes: Optional[str] = None
+
+
+class MealPlanFoodPatchData(Payload):
+    food_name: NonEmptyStr = None
+    prescribed_quantity: Quantity = None
+    unit_measure: NonEmptyStr = None
+    preparation_notes: Optional[str] = None
+
+
+# Tradução dos erros do Pydantic para as mensagens da API
+
+FIELD_MESSAGES = {
+    'full_name': 'Nome completo deve ter pelo menos 3 caracteres',
+    'birth_date': 'Data de nascimento deve estar no formato YYYY-MM-DD',
+    'gender': 'Gênero deve ser M, F ou O',
+    'email': 'Formato de e-mail inválido',
+    'phone': 'O número de telefone deve ter 11 dígitos numéricos',
+    'cpf': 'CPF deve ter 11 dígitos numéricos',
+    'weight': 'Peso deve ser um número positivo e menor que 500',
+    'height': 'Altura deve ser um número positivo entre 0 e 3',
+    'patient_id': "O campo 'patient_id' deve ser um número inteiro",
+    'start_date': "O campo 'start_date' deve estar no formato YYYY-MM-DD",
+    'end_date': "O campo 'end_date' deve estar no formato YYYY-MM-DD",
+    'day_of_plan': "O campo 'day_of_plan' deve estar no formato YYYY-MM-DD",
+    'time_scheduled': "O campo 'time_scheduled' deve estar no formato HH:MM",
+    'prescribed_quantity': "O campo 'prescribed_quantity' deve ser um número positivo",
+    'energy_value_kcal': "O campo 'energy_value_kcal' deve ser numérico",
+    'entries': 'entries deve ser uma lista não vazia',
+    'foods': 'foods deve ser uma lista não vazia'
+}
+
+# Erros de tipo com mensagem própria, diferente da de faixa de valores
+TYPE_MESSAGES = {
+    ('weight', 'float_parsing'): 'Peso deve ser um número válido',
+    ('weight', 'float_type'): 'Peso deve ser um número válido',
+    ('height', 'float_parsing'): 'Altura deve ser um número válido',
+    ('height', 'float_type'): 'Altura deve ser um número válido'
+}
+
+# Erros de tipo dos demais campos, pelo tipo do erro do Pydantic
+ERROR_TYPE_MESSAGES = {
+    'string_type': "O campo '{field}' deve ser um texto",
+    'int_type': "O campo '{field}' deve ser um número inteiro",
+    'int_parsing': "O campo '{field}' deve ser um número inteiro",
+    'int_from_float': "O campo '{field}' deve ser um número inteiro",
+    'float_type': "O campo '{field}' deve ser um número",
+    'float_parsing': "O campo '{field}' deve ser um número",
+    'date_type': "O campo '{field}' deve estar no formato YYYY-MM-DD",
+    'date_parsing': "O campo '{field}' deve estar no formato YYYY-MM-DD",
+    'date_from_datetime_parsing': "O campo '{field}' deve estar no formato YYYY-MM-DD",
+    'list_type': "O campo '{field}' deve ser uma lista",
+    'model_type': "Os itens de '{field}' devem ser objetos JSON",
+    'model_attributes_type': "Os itens de '{field}' devem ser objetos JSON"
+}
+
+LOCATION_LABELS = {'entries': 'entrada', 'foods': 'alimento'}
+
+
+def _error_message(error):
+    loc = error['loc']
+    if error['type'] == 'invalid':
+        return error['msg']
+    if not loc:
+        return 'O corpo da requisição deve ser um objeto JSON'
+
+    field = next((part for part in reversed(loc) if isinstance(part, str)), None)
+    if error['type'] == 'missing':
+        message = f"O campo '{field}' é obrigatório e não pode ser vazio"
+    elif isinstance(loc[-1], int) and error['type'] in ERROR_TYPE_MESSAGES:
+        # O erro é no próprio item da lista (ex: entries: [5]), não no campo
+        message = ERROR_TYPE_MESSAGES[error['type']].format(field=field)
+    else:
+        message = TYPE_MESSAGES.get((field, error['type'])) or FIELD_MESSAGES.get(field) or ERROR_TYPE_MESSAGES.get(
+            error['type'], "O campo '{field}' é obrigatório e não pode ser vazio"
+        ).format(field=field)
+
+    # Posição em listas aninhadas, ex: (entrada 2, alimento 1)
+    positions = [
+        f"{LOCATION_LABELS.get(loc[index - 1], 'item')} {part + 1}"
+        for index, part in enumerate(loc) if isinstance(part, int) and index > 0
+    ]
+    return f"{message} ({', '.join(positions)})" if positions else message
+
+
+def validate_payload(model, data):
+    """
+    Valida e converte um corpo de requisição com um dos modelos acima
+
+    Returns:
+        tuple: (instância do modelo, None) ou (None, corpo da resposta 400) com
+        'message' (primeiro erro) e 'errors' (lista de {'field', 'message'})
+    """
+    try:
+        return model.model_validate(data), None
+    except ValidationError as exc:
+        errors = [
+            {'field': '.'.join(str(part) for part in error['loc']), 'message': _error_message(error)}
+            for error in exc.errors(include_url=False, include_input=False, include_context=False)
+        ]
+        return None, {'message': errors[0]['message'], 'errors': errors}
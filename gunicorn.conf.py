@@ -0,0 +1,19 @@
+import os
+
+# Configuração do gunicorn usada pelo Procfile (gunicorn -c gunicorn.conf.py run:app)
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+
+# 'sync' (padrão): cada worker atende uma requisição por vez e fica parado durante as queries.
+# 'gevent': cada worker atende até worker_connections requisições ao mesmo tempo. O PyMySQL é
+# escrito em Python puro, então com o monkey patch do gevent a espera pelo MySQL (e pelo pool
+# de conexões) libera o worker para as demais requisições. Requer o pacote gevent.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# Segundos sem resposta antes de o worker ser reiniciado (o padrão do gunicorn); a importação
+# de pacientes é a requisição mais longa e PATIENT_IMPORT_MAX_ROWS deve caber nesse tempo
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+# A aplicação é importada dentro de cada worker, depois do monkey patch do gevent;
+# com preload_app os locks do pool seriam criados antes do patch e bloqueariam o worker inteiro
+preload_app = False
@@ -0,0 +1,122 @@
+import threading
+import time
+import pytest
+from app import create_app
+from app.utils import db
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self._connection = connection
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        time.sleep(0.02)
+        self._connection.queries.append(query)
+        self._rows = [{'query': query, 'params': params}]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    open = True
+
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    def make(size):
+        pool = db.ConnectionPool(size=size, timeout=0.5, recycle=3600)
+        pool.connections = []
+
+        def connect():
+            connection = FakeConnection()
+            pool.connections.append(connection)
+            return connection
+
+        monkeypatch.setattr(pool, '_connect', connect)
+        monkeypatch.setattr(db, '_pool', pool)
+        return pool
+    return make
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+QUERIES = [(f"SELECT {index} FROM tb_patients WHERE id = %s", (index,)) for index in range(3)]
+
+
+def test_results_keep_query_order_and_use_free_connections(app, make_pool):
+    pool = make_pool(size=4)
+    with app.app_context():
+        results = db.execute_many_concurrently(QUERIES)
+
+    assert [rows[0]['params'] for rows in results] == [(0,), (1,), (2,)]
+    assert len(pool.connections) == 3
+    assert pool._idle.qsize() == 3
+
+
+def test_runs_on_request_connection_when_pool_is_busy(app, make_pool):
+    pool = make_pool(size=1)
+    with app.app_context():
+        results = db.execute_many_concurrently(QUERIES)
+
+    assert [rows[0]['params'] for rows in results] == [(0,), (1,), (2,)]
+    assert len(pool.connections) == 1
+    assert len(pool.connections[0].queries) == 3
+
+
+def test_concurrent_requests_holding_every_slot_do_not_wait_for_the_pool(app, make_pool):
+    pool = make_pool(size=2)
+    holding = threading.Barrier(2)
+    outcomes = []
+
+    def request():
+        with app.app_context():
+            try:
+                db.execute_query("SELECT 1")
+                # Cada requisição segura a própria conexão: o pool fica sem slots livres
+                holding.wait()
+                outcomes.append(db.execute_many_concurrently(QUERIES))
+            except Exception as e:
+                outcomes.append(e)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(outcome, list) and len(outcome) == 3 for outcome in outcomes), outcomes
+    assert time.perf_counter() - started < pool.timeout
+    assert pool._idle.qsize() == 2
@@ -0,0 +1,137 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from app.resources.user import apply_meal_plan_entries_diff
+
+FOOD_IDS = {'Pão francês': 10, 'Kiwi': 20}
+
+
+class FakeTransaction:
+    """Transação falsa: devolve as linhas gravadas do plano e registra os demais statements"""
+
+    def __init__(self, stored_rows, new_entry_ids=None):
+        self.stored_rows = stored_rows
+        self.new_entry_ids = new_entry_ids or {}
+        self.statements = []
+
+    def execute(self, query, params=None, return_id=False):
+        query = ' '.join(query.split())
+        if 'FOR UPDATE' in query:
+            return self.stored_rows
+        self.statements.append((query, params))
+        if query.startswith('SELECT id, meal_type_name'):
+            entries = {(row['meal_type_name'], row['day_of_plan']): row['id'] for row in self.stored_rows}
+            entries.update(self.new_entry_ids)
+            return [
+                {'id': entry_id, 'meal_type_name': name, 'day_of_plan': day}
+                for (name, day), entry_id in entries.items()
+            ]
+        return 1
+
+    def execute_many(self, query, params_seq):
+        self.statements.append((' '.join(query.split()), list(params_seq)))
+        return len(params_seq)
+
+    def statements_starting(self, prefix):
+        return [params for query, params in self.statements if query.startswith(prefix)]
+
+
+def stored_row(entry_id, meal_type_name, food_id, portion, meal_plan_food_id, time_scheduled='08:00:00', notes=None):
+    return {
+        'id': entry_id,
+        'meal_type_name': meal_type_name,
+        'day_of_plan': '2024-06-01',
+        'time_scheduled': time_scheduled,
+        'notes': notes,
+        'meal_plan_food_id': meal_plan_food_id,
+        'food_id': food_id,
+        'prescribed_portion': Decimal(portion),
+        'prescribed_unit_measure': 'unidade',
+        'preparation_notes': None
+    }
+
+
+def submitted_entry(meal_type_name, foods, time_scheduled='08:00', notes=None):
+    return {
+        'meal_type_name': meal_type_name,
+        'day_of_plan': date(2024, 6, 1),
+        'time_scheduled': time_scheduled,
+        'notes': notes,
+        'foods': [
+            {'food_name': name, 'prescribed_quantity': quantity, 'unit_measure': 'unidade', 'preparation_notes': None}
+            for name, quantity in foods
+        ]
+    }
+
+
+STORED = [
+    stored_row(1, 'Café', 10, '1.00', 100),
+    stored_row(1, 'Café', 20, '2.00', 101),
+    stored_row(2, 'Almoço', 20, '1.00', 102, time_scheduled='12:00:00')
+]
+
+
+def submitted(**changes):
+    entries = {
+        'Café': submitted_entry('Café', [('Pão francês', 1), ('Kiwi', 2)]),
+        'Almoço': submitted_entry('Almoço', [('Kiwi', 1)], time_scheduled='12:00')
+    }
+    entries.update(changes)
+    return [entry for entry in entries.values() if entry is not None]
+
+
+def test_unchanged_plan_writes_nothing():
+    tx = FakeTransaction(STORED)
+    apply_meal_plan_entries_diff(tx, 5, submitted(), FOOD_IDS)
+    assert tx.statements == []
+
+
+def test_same_entry_under_other_case_and_accents_writes_nothing():
+    tx = FakeTransaction(STORED)
+    apply_meal_plan_entries_diff(tx, 5, submitted(Almoço=submitted_entry('almoco', [('Kiwi', 1)], time_scheduled='12:00')), FOOD_IDS)
+    assert tx.statements == []
+
+
+@pytest.mark.parametrize('quantity, stored', [(1.005, '1.01'), (0.125, '0.13'), (2.675, '2.68')])
+def test_quantity_rounded_like_mysql_decimal_writes_nothing(quantity, stored):
+    rows = [stored_row(1, 'Café', 10, stored, 100)]
+    tx = FakeTransaction(rows)
+    apply_meal_plan_entries_diff(tx, 5, [submitted_entry('Café', [('Pão francês', quantity)])], FOOD_IDS)
+    assert tx.statements == []
+
+
+def test_changed_time_updates_entry_without_refilling_foods():
+    tx = FakeTransaction(STORED)
+    apply_meal_plan_entries_diff(tx, 5, submitted(Almoço=submitted_entry('Almoço', [('Kiwi', 1)], time_scheduled='12:30')), FOOD_IDS)
+
+    upserts = tx.statements_starting('INSERT INTO tb_meal_plan_entries')
+    assert upserts == [[(5, 'Almoço', date(2024, 6, 1), '12:30', None)]]
+    assert tx.statements_starting('DELETE') == []
+    assert tx.statements_starting('INSERT INTO tb_meal_plan_foods') == []
+
+
+def test_changed_food_list_refills_only_that_entry():
+    tx = FakeTransaction(STORED)
+    apply_meal_plan_entries_diff(tx, 5, submitted(Café=submitted_entry('Café', [('Pão francês', 1), ('Kiwi', 3)])), FOOD_IDS)
+
+    assert tx.statements_starting('INSERT INTO tb_meal_plan_entries') == []
+    assert tx.statements_starting('DELETE FROM tb_meal_plan_foods') == [([1],)]
+    food_rows = tx.statements_starting('INSERT INTO tb_meal_plan_foods')
+    assert food_rows == [[(1, 10, 1.0, 'unidade', 1.0, None), (1, 20, 3.0, 'unidade', 3.0, None)]]
+
+
+def test_missing_entry_is_deleted():
+    tx = FakeTransaction(STORED)
+    apply_meal_plan_entries_diff(tx, 5, submitted(Almoço=None), FOOD_IDS)
+
+    assert tx.statements == [('DELETE FROM tb_meal_plan_entries WHERE id IN %s', ([2],))]
+
+
+def test_new_entry_is_inserted_with_its_foods():
+    tx = FakeTransaction(STORED, new_entry_ids={('Jantar', '2024-06-01'): 3})
+    entries = submitted() + [submitted_entry('Jantar', [('Kiwi', 1)], time_scheduled='19:00')]
+    apply_meal_plan_entries_diff(tx, 5, entries, FOOD_IDS)
+
+    assert tx.statements_starting('INSERT INTO tb_meal_plan_entries') == [[(5, 'Jantar', date(2024, 6, 1), '19:00', None)]]
+    assert tx.statements_starting('DELETE') == []
+    assert tx.statements_starting('INSERT INTO tb_meal_plan_foods') == [[(3, 20, 1.0, 'unidade', 1.0, None)]]
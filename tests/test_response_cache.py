@@ -0,0 +1,39 @@
+from app.utils.response_cache import LocalCacheBackend, MealPlanResponseCache
+
+
+def make_cache(max_windows=4):
+    return MealPlanResponseCache(LocalCacheBackend(maxsize=8, ttl=60), max_windows=max_windows)
+
+
+def cached_fields(cache, patient_id):
+    return cache.backend._cache.get(cache._key(patient_id))
+
+
+def test_set_drops_other_plan_versions():
+    cache = make_cache()
+    for version in range(1, 200):
+        cache.set(3, 5, version, (None, None), {'version': version})
+
+    assert list(cached_fields(cache, 3)) == ['5:199::']
+    assert cache.get(3, 5, 199, (None, None)) == {'version': 199}
+    assert cache.get(3, 5, 198, (None, None)) is None
+
+
+def test_set_caps_windows_per_patient():
+    cache = make_cache(max_windows=4)
+    days = [f'2024-06-{day:02d}' for day in range(1, 31)]
+    for day in days:
+        cache.set(3, 5, 1, (day, day), {'day': day})
+
+    assert len(cached_fields(cache, 3)) == 4
+    assert cache.get(3, 5, 1, (days[-1], days[-1])) == {'day': days[-1]}
+    assert cache.get(3, 5, 1, (days[0], days[0])) is None
+
+
+def test_version_prefix_does_not_match_longer_versions():
+    cache = make_cache()
+    cache.set(3, 5, 10, (None, None), {'version': 10})
+    cache.set(3, 5, 1, (None, None), {'version': 1})
+
+    assert cache.get(3, 5, 10, (None, None)) is None
+    assert cache.get(3, 5, 1, (None, None)) == {'version': 1}
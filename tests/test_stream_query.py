@@ -0,0 +1,108 @@
+import pytest
+from werkzeug.test import EnvironBuilder
+from app import create_app
+from app.utils import db
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._rows = list(rows)
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchmany(self, size):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    open = True
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self.rows)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    rows = [{'id': i, 'full_name': f'Paciente {i}', 'email': f'p{i}@x.com'} for i in range(1, 4)]
+    pool = db.ConnectionPool(size=3, timeout=0.1, recycle=3600)
+    monkeypatch.setattr(pool, '_connect', lambda: FakeConnection(rows))
+    monkeypatch.setattr(db, '_pool', pool)
+    return pool
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['JWT_SECRET_KEY'] = 'chave-de-teste-com-pelo-menos-32-bytes'
+    return app
+
+
+def call_without_reading_body(app, method, path, headers=None):
+    """Chama a aplicação como um servidor WSGI e fecha a resposta sem ler o corpo"""
+    environ = EnvironBuilder(path=path, method=method, headers=headers).get_environ()
+    app_iter = app(environ, lambda status, headers, exc_info=None: None)
+    app_iter.close()
+
+
+def export_headers(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity='1', additional_claims={'role': 'professional'})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_stream_query_close_before_iterating_releases_connection(pool):
+    for _ in range(5):
+        rows = db.stream_query("SELECT id FROM tb_patients")
+        rows.close()
+        rows.close()
+    assert pool._slots.acquire(timeout=0)
+
+
+def test_stream_query_exhausted_keeps_connection(pool):
+    rows = db.stream_query("SELECT id FROM tb_patients")
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    rows.close()
+    assert pool._idle.qsize() == 1
+
+
+@pytest.mark.parametrize('method', ['HEAD', 'GET'])
+def test_patient_list_stream_unread_body_releases_connection(app, pool, method):
+    for _ in range(pool.size + 2):
+        call_without_reading_body(app, method, '/patients/1?stream=true')
+
+    response = app.test_client().get('/patients/1?stream=true')
+    assert response.status_code == 200
+    assert response.get_json()['patients'][0]['id'] == 1
+    response.close()
+
+
+@pytest.mark.parametrize('method', ['HEAD', 'GET'])
+def test_patient_export_unread_body_releases_connection(app, pool, method):
+    headers = export_headers(app)
+    for _ in range(pool.size + 2):
+        call_without_reading_body(app, method, '/patients/1/export', headers)
+
+    response = app.test_client().get('/patients/1/export?format=csv', headers=headers)
+    assert response.status_code == 200
+    assert response.data.startswith(b'id,full_name')
+    response.close()
@@ -0,0 +1,78 @@
+import pytest
+from app.utils.validation import (MealPlanCreateData, MealPlanUpdateData, PatientRegistrationData,
+                                  validate_payload)
+
+
+PATIENT = {
+    'full_name': 'Ana Maria',
+    'birth_date': '2000-01-01',
+    'gender': 'F',
+    'email': 'ana@x.com',
+    'password': 'Senha@123',
+    'phone': '11999999999',
+    'cpf': '12345678901',
+    'weight': 60,
+    'height': 1.6
+}
+
+
+@pytest.mark.parametrize('birth_date', [0, 946684800, '0', '2000-01-01T00:00:00', '01/01/2000'])
+def test_dates_must_be_yyyy_mm_dd_strings(birth_date):
+    data, error = validate_payload(PatientRegistrationData, {**PATIENT, 'birth_date': birth_date})
+
+    assert data is None
+    assert error['message'] == 'Data de nascimento deve estar no formato YYYY-MM-DD'
+
+
+@pytest.mark.parametrize('field, message', [('weight', 'Peso deve ser um número válido'),
+                                            ('height', 'Altura deve ser um número válido')])
+def test_booleans_are_not_numbers(field, message):
+    data, error = validate_payload(PatientRegistrationData, {**PATIENT, field: True})
+
+    assert data is None
+    assert error['message'] == message
+
+
+def test_numbers_may_be_sent_as_strings():
+    data, error = validate_payload(PatientRegistrationData, {**PATIENT, 'weight': '60.5', 'height': '1.6'})
+
+    assert error is None
+    assert (data.weight, data.height) == (60.5, 1.6)
+
+
+def meal_plan_entry(meal_type_name, day_of_plan):
+    return {
+        'meal_type_name': meal_type_name,
+        'day_of_plan': day_of_plan,
+        'time_scheduled': '08:00',
+        'foods': [{'food_name': 'Kiwi', 'prescribed_quantity': 1, 'unit_measure': 'unidade', 'energy_value_kcal': 44}]
+    }
+
+
+def meal_plan(entries):
+    return {
+        'patient_id': 3,
+        'plan_name': 'Plano',
+        'start_date': '2024-06-01',
+        'end_date': '2024-06-30',
+        'entries': entries
+    }
+
+
+@pytest.mark.parametrize('model', [MealPlanCreateData, MealPlanUpdateData])
+@pytest.mark.parametrize('other_name', ['Café', 'café', 'CAFE', 'Cafe '])
+def test_meal_plan_rejects_repeated_meal_on_the_same_day(model, other_name):
+    entries = [meal_plan_entry('Café', '2024-06-01'), meal_plan_entry(other_name, '2024-06-01')]
+    data, error = validate_payload(model, meal_plan(entries))
+
+    assert data is None
+    assert error['message'] == 'Há mais de uma entrada para a mesma refeição no mesmo dia'
+
+
+@pytest.mark.parametrize('model', [MealPlanCreateData, MealPlanUpdateData])
+def test_meal_plan_accepts_same_meal_on_other_days(model):
+    entries = [meal_plan_entry('Café', '2024-06-01'), meal_plan_entry('Café', '2024-06-02')]
+    data, error = validate_payload(model, meal_plan(entries))
+
+    assert error is None
+    assert len(data.entries) == 2